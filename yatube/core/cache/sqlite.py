@@ -0,0 +1,290 @@
+"""
+Общий для всех процессов хоста кэш в файле SQLite в режиме WAL.
+
+Читатели не блокируют писателей, вытеснение — по давности обращения
+(LRU) при превышении MAX_ENTRIES записей или MAX_SIZE байт, incr
+атомарен за счёт BEGIN IMMEDIATE. Внешние сервисы не нужны.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_accessed
+    ON cache_entries (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, entries, bytes) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entries_insert
+    AFTER INSERT ON cache_entries BEGIN
+        UPDATE cache_stats
+        SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+    END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_delete
+    AFTER DELETE ON cache_entries BEGIN
+        UPDATE cache_stats
+        SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+    END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_resize
+    AFTER UPDATE OF size ON cache_entries BEGIN
+        UPDATE cache_stats
+        SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+    END;
+"""
+
+UPSERT = (
+    'INSERT INTO cache_entries (key, value, expires, accessed, size) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed, size = excluded.size'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+# Время последнего обращения обновляется не чаще раза в секунду,
+# чтобы горячие ключи не превращали каждое чтение в запись.
+ACCESS_RESOLUTION = 1.0
+MAX_VARIABLES = 500
+
+
+def placeholders(values):
+    return ', '.join('?' * len(values))
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = options.get('MAX_SIZE')
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _upsert(self, connection, key, value, timeout, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        connection.execute(UPSERT, (
+            key, data, self.get_backend_timeout(timeout), now, len(data),
+        ))
+
+    def _over_limits(self, connection):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats WHERE id = 1').fetchone()
+        over_size = self._max_size is not None and size > self._max_size
+        return entries, entries > self._max_entries or over_size
+
+    def _cull(self, connection, now):
+        entries, over = self._over_limits(connection)
+        if not over:
+            return
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (now,))
+        entries, over = self._over_limits(connection)
+        while over and entries:
+            if self._cull_frequency == 0:
+                connection.execute('DELETE FROM cache_entries')
+                return
+            count = max(
+                entries // self._cull_frequency,
+                entries - self._max_entries,
+                1,
+            )
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)',
+                (count,),
+            )
+            entries, over = self._over_limits(connection)
+
+    def _touch_accessed(self, connection, keys, now):
+        """
+        Отметка для LRU — по возможности: чтение не ждёт писателей.
+        На время UPDATE ожидание блокировки отключается, и если запись
+        сейчас идёт (SQLITE_BUSY), отметка просто пропускается.
+        """
+        connection.execute('PRAGMA busy_timeout = 0')
+        try:
+            for start in range(0, len(keys), MAX_VARIABLES):
+                chunk = keys[start:start + MAX_VARIABLES]
+                connection.execute(
+                    'UPDATE cache_entries SET accessed = ? '
+                    f'WHERE accessed < ? AND key IN ({placeholders(chunk)})',
+                    (now, now - ACCESS_RESOLUTION, *chunk),
+                )
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            connection.execute(
+                f'PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}')
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            f'SELECT value, accessed FROM cache_entries '
+            f'WHERE key = ? AND {ALIVE}', (key, now),
+        ).fetchone()
+        if row is None:
+            return default
+        value, accessed = row
+        if accessed < now - ACCESS_RESOLUTION:
+            self._touch_accessed(connection, [key], now)
+        return pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        made_keys = list(key_map)
+        now = time.time()
+        connection = self._connection()
+        found = {}
+        for start in range(0, len(made_keys), MAX_VARIABLES):
+            chunk = made_keys[start:start + MAX_VARIABLES]
+            rows = connection.execute(
+                f'SELECT key, value FROM cache_entries '
+                f'WHERE key IN ({placeholders(chunk)}) '
+                f'AND {ALIVE}', (*chunk, now),
+            )
+            for made_key, value in rows:
+                found[key_map[made_key]] = pickle.loads(value)
+        if found:
+            self._touch_accessed(
+                connection,
+                [made for made, key in key_map.items() if key in found],
+                now,
+            )
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            self._upsert(connection, key, value, timeout, now)
+            self._cull(connection, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as connection:
+            for key, value in data.items():
+                self._upsert(
+                    connection, self._key(key, version), value, timeout, now)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            exists = connection.execute(
+                f'SELECT 1 FROM cache_entries WHERE key = ? AND {ALIVE}',
+                (key, now),
+            ).fetchone()
+            if exists:
+                return False
+            self._upsert(connection, key, value, timeout, now)
+            self._cull(connection, now)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache_entries SET expires = ?, accessed = ? '
+                f'WHERE key = ? AND {ALIVE}',
+                (self.get_backend_timeout(timeout), now, key, now),
+            )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {ALIVE}',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL)
+            connection.execute(
+                'UPDATE cache_entries SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (data, len(data), now, key),
+            )
+        return new_value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {ALIVE}',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                'DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self._key(key, version) for key in keys]
+        with self._write() as connection:
+            for start in range(0, len(made_keys), MAX_VARIABLES):
+                chunk = made_keys[start:start + MAX_VARIABLES]
+                connection.execute(
+                    f'DELETE FROM cache_entries '
+                    f'WHERE key IN ({placeholders(chunk)})', chunk,
+                )
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache_entries')
@@ -0,0 +1,29 @@
+"""
+Настройка соединений SQLite при открытии.
+
+К каждому новому соединению применяются PRAGMA из settings.SQLITE_PRAGMAS:
+WAL, чтобы чтение не ждало пишущих, synchronous=NORMAL (в режиме WAL
+данные не портятся при сбое, теряется только последняя транзакция),
+mmap_size и cache_size для чтения без системных вызовов и
+busy_timeout, чтобы конкурирующая запись ждала блокировку, а не падала
+с «database is locked».
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на соединении sqlite3 (не обёртке Django)."""
+    for statement in pragma_statements(pragmas):
+        connection.execute(statement)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
@@ -0,0 +1,57 @@
+"""
+«Дырки» в общих для всех страницах.
+
+Страница рендерится без данных посетителя: вместо шапки с именем
+пользователя, кнопки подписки и формы комментария тег {% hole %}
+оставляет метку. Такую страницу можно положить в кэш один раз для всех,
+а HoleMiddleware на каждом ответе, из кэша или свежем, заменяет метки
+фрагментами текущего пользователя.
+"""
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+MARKER = '<!--hole:{payload}-->'
+MARKER_RE = re.compile(rb'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+_registry = {}
+
+
+def register(name, template_name):
+    """
+    Регистрирует дырку name: функция (request, **kwargs) возвращает
+    контекст для template_name поверх контекстных процессоров.
+    """
+    def decorator(func):
+        _registry[name] = (template_name, func)
+        return func
+    return decorator
+
+
+def marker(name, kwargs):
+    # Аргументы в base64: в метке не окажется «-->», а подделать её
+    # текстом поста нельзя — «<» в нём экранируется.
+    payload = base64.urlsafe_b64encode(
+        json.dumps([name, kwargs]).encode()).decode()
+    return MARKER.format(payload=payload)
+
+
+def render_hole(request, name, kwargs):
+    template_name, func = _registry[name]
+    return render_to_string(
+        template_name, func(request, **kwargs), request=request)
+
+
+def fill(content, request):
+    """content с дырками, заполненными для request."""
+    def replace(match):
+        name, kwargs = json.loads(base64.urlsafe_b64decode(match.group(1)))
+        return render_hole(request, name, kwargs).encode()
+    return MARKER_RE.sub(replace, content)
+
+
+@register('header', 'includes/header.html')
+def header(request, query=''):
+    return {'query': query}
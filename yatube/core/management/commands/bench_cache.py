@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+}
+COUNTER_KEY = 'bench:counter'
+
+
+def run_worker(backend, location, options, seed, results):
+    """Имитирует воркер: читает страницу, при промахе «рендерит» её."""
+    cache = import_string(BACKENDS[backend])(location, {
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2},
+    })
+    rnd = random.Random(seed)
+    payload = 'x' * options['value_size']
+    hits = misses = increments = 0
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(options['operations']):
+        key = f'bench:page:{int(rnd.paretovariate(1.1)) % options["keys"]}'
+        op_started = time.perf_counter()
+        value = cache.get(key)
+        latencies.append(time.perf_counter() - op_started)
+        if value is None:
+            misses += 1
+            time.sleep(options['render_ms'] / 1000)
+            cache.set(key, payload)
+        else:
+            hits += 1
+        if rnd.random() < options['incr_share']:
+            cache.add(COUNTER_KEY, 0)
+            cache.incr(COUNTER_KEY)
+            increments += 1
+    results.put({
+        'hits': hits,
+        'misses': misses,
+        'increments': increments,
+        'elapsed': time.perf_counter() - started,
+        'latencies': latencies,
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кэша (LocMem, FileBased, SQLite) под '
+        'нагрузкой нескольких процессов: пропускная способность, доля '
+        'попаданий, задержка get и атомарность incr.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', nargs='+', choices=sorted(BACKENDS),
+            default=['locmem', 'file', 'sqlite'],
+        )
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=200)
+        parser.add_argument('--value-size', type=int, default=20000)
+        parser.add_argument('--render-ms', type=float, default=2.0)
+        parser.add_argument('--incr-share', type=float, default=0.05)
+
+    def run_backend(self, backend, options):
+        directory = tempfile.mkdtemp(prefix=f'bench-{backend}-')
+        location = directory
+        if backend == 'sqlite':
+            location = os.path.join(directory, 'cache.sqlite3')
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(backend, location, options, seed, results),
+            )
+            for seed in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        wall = time.perf_counter() - started
+        counter = import_string(BACKENDS[backend])(
+            location, {}).get(COUNTER_KEY)
+        shutil.rmtree(directory, ignore_errors=True)
+        latencies = sorted(
+            latency for report in reports for latency in report['latencies'])
+        hits = sum(report['hits'] for report in reports)
+        total = hits + sum(report['misses'] for report in reports)
+        increments = sum(report['increments'] for report in reports)
+        return {
+            'backend': backend,
+            'ops_per_sec': total / wall,
+            'hit_ratio': hits / total,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+            'incr': (
+                'local' if backend == 'locmem'
+                else 'ok' if counter == increments else 'lost'
+            ),
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"backend":<8} {"ops/s":>9} {"hit %":>6} '
+            f'{"get p50":>8} {"get p95":>8} {"incr":>5}'
+        )
+        for backend in options['backends']:
+            row = self.run_backend(backend, options)
+            self.stdout.write(
+                f'{row["backend"]:<8} {row["ops_per_sec"]:>9.0f} '
+                f'{row["hit_ratio"] * 100:>6.1f} {row["p50_ms"]:>7.2f}ms '
+                f'{row["p95_ms"]:>7.2f}ms '
+                f'{row["incr"]:>5}'
+            )
@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+# Настройки SQLite по умолчанию — то, что было до core/db.py.
+PROFILES = {
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'production': settings.SQLITE_PRAGMAS,
+}
+SCHEMA = '''
+CREATE TABLE posts (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX posts_pub_date ON posts (pub_date);
+CREATE INDEX posts_author ON posts (author_id, pub_date);
+CREATE TABLE stats (author_id INTEGER PRIMARY KEY, posts_count INTEGER);
+'''
+AUTHORS = 100
+
+
+def connect(path, profile):
+    # Таймаут модуля sqlite3 по умолчанию, как у Django без OPTIONS;
+    # busy_timeout профиля его переопределяет.
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(connection, PROFILES[profile])
+    return connection
+
+
+def run_reader(path, profile, options, seed, results):
+    """Читает страницы ленты, как index и profile."""
+    connection = connect(path, profile)
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + options['duration']
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.execute(
+                'SELECT id, text FROM posts ORDER BY pub_date DESC '
+                'LIMIT 10 OFFSET ?', (rnd.randrange(1000),)).fetchall()
+            connection.execute(
+                'SELECT id, text FROM posts WHERE author_id = ? '
+                'ORDER BY pub_date DESC LIMIT 10',
+                (rnd.randrange(AUTHORS),)).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    results.put({'kind': 'read', 'latencies': latencies, 'errors': errors})
+
+
+def run_writer(path, profile, options, seed, results):
+    """Пишет посты со счётчиком автора, как post_create и add_comment."""
+    connection = connect(path, profile)
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + options['duration']
+    while time.perf_counter() < deadline:
+        author_id = rnd.randrange(AUTHORS)
+        started = time.perf_counter()
+        try:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO posts (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                [(author_id, 'x' * 500, time.time())] * options['write_rows'])
+            connection.execute(
+                'UPDATE stats SET posts_count = posts_count + ? '
+                'WHERE author_id = ?', (options['write_rows'], author_id))
+            connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+        latencies.append(time.perf_counter() - started)
+    results.put({'kind': 'write', 'latencies': latencies, 'errors': errors})
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    return values[max(int(len(values) * share) - 1, 0)] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLite с настройками по умолчанию (журнал DELETE) и '
+        'с SQLITE_PRAGMAS (WAL и др.) при одновременном чтении и записи '
+        'из нескольких процессов: задержка чтения, число записей и '
+        'ошибки «database is locked».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=sorted(PROFILES),
+            default=['default', 'production'],
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument(
+            '--write-rows', type=int, default=20,
+            help='Строк в одной пишущей транзакции.',
+        )
+
+    def prepare(self, path, profile, options):
+        connection = connect(path, profile)
+        connection.executescript(SCHEMA)
+        rnd = random.Random(0)
+        now = time.time()
+        with connection:
+            connection.executemany(
+                'INSERT INTO posts (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                ((rnd.randrange(AUTHORS), 'x' * 500, now - index)
+                 for index in range(options['rows'])))
+            connection.executemany(
+                'INSERT INTO stats VALUES (?, 0)',
+                ((author_id,) for author_id in range(AUTHORS)))
+        connection.close()
+
+    def run_profile(self, profile, options):
+        directory = tempfile.mkdtemp(prefix=f'bench-sqlite-{profile}-')
+        path = os.path.join(directory, 'db.sqlite3')
+        self.prepare(path, profile, options)
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=run_reader,
+                args=(path, profile, options, seed, results))
+            for seed in range(options['readers'])
+        ] + [
+            multiprocessing.Process(
+                target=run_writer,
+                args=(path, profile, options, seed, results))
+            for seed in range(options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        shutil.rmtree(directory, ignore_errors=True)
+        row = {'profile': profile}
+        for kind in ('read', 'write'):
+            latencies = sorted(
+                latency for report in reports if report['kind'] == kind
+                for latency in report['latencies'])
+            row[f'{kind}s'] = len(latencies) / options['duration']
+            row[f'{kind}_errors'] = sum(
+                report['errors'] for report in reports
+                if report['kind'] == kind)
+            row[f'{kind}_p50'] = percentile(latencies, 0.5)
+            row[f'{kind}_p99'] = percentile(latencies, 0.99)
+            row[f'{kind}_max'] = percentile(latencies, 1)
+        return row
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"profile":<11} {"reads/s":>8} {"read p50":>9} '
+            f'{"read p99":>9} {"read max":>9} {"writes/s":>9} '
+            f'{"write p99":>10} {"locked":>7}'
+        )
+        for profile in options['profiles']:
+            row = self.run_profile(profile, options)
+            self.stdout.write(
+                f'{profile:<11} {row["reads"]:>8.0f} '
+                f'{row["read_p50"]:>7.2f}ms {row["read_p99"]:>7.2f}ms '
+                f'{row["read_max"]:>7.1f}ms {row["writes"]:>9.0f} '
+                f'{row["write_p99"]:>8.1f}ms '
+                f'{row["read_errors"] + row["write_errors"]:>7}'
+            )
@@ -0,0 +1,51 @@
+from django.conf import settings
+
+from .holes import MARKER_RE, fill
+from .routers import PIN_COOKIE, begin_request, replicas, wrote
+
+
+class PrimaryPinMiddleware:
+    """
+    Закрепляет клиента за основной базой на время, пока реплики могут
+    не видеть его запись. Стоит выше SessionMiddleware, чтобы учесть
+    и сохранение сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        begin_request(pinned=PIN_COOKIE in request.COOKIES)
+        response = self.get_response(request)
+        if replicas() and wrote():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        begin_request()
+        return response
+
+
+class HoleMiddleware:
+    """
+    Заполняет дырки {% hole %} фрагментами текущего пользователя.
+    Стоит ниже сессий, CSRF и аутентификации: фрагментам нужен
+    request.user, а их CSRF-токен и обращение к сессии должны попасть
+    в cookie и Vary ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')
+                or not MARKER_RE.search(response.content)):
+            return response
+        response.content = fill(response.content, request)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        return response
@@ -0,0 +1,84 @@
+"""
+Чтение с реплик базы для страниц только на чтение.
+
+Представления, помеченные use_replica, читают с одной из реплик
+settings.DATABASE_REPLICAS, всё остальное и любая запись идёт в default.
+Запрос, в котором была запись, закрепляет клиента за основной базой
+cookie на DATABASE_REPLICA_PIN_SECONDS секунд (PrimaryPinMiddleware),
+поэтому после post_create и подписки пользователь сразу видит свои
+изменения, даже если реплика отстаёт.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary'
+# Сессии читаются только с основной базы: только что выданная сессия
+# могла ещё не дойти до реплики.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def begin_request(pinned=False):
+    _state.replica = None
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def pinned():
+    """Закреплён ли клиент текущего запроса за основной базой."""
+    return getattr(_state, 'pinned', False)
+
+
+def on_replica():
+    """Читает ли текущий запрос с реплики."""
+    return getattr(_state, 'replica', None) is not None
+
+
+def wrote():
+    """Была ли в текущем запросе запись в базу."""
+    return getattr(_state, 'wrote', False)
+
+
+def use_replica(view_func):
+    """
+    Чтения представления идут на случайно выбранную реплику (одну на
+    весь запрос), если клиент не закреплён за основной базой.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not replicas() or pinned():
+            return view_func(request, *args, **kwargs)
+        _state.replica = random.choice(replicas())
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит с основной базы вместе с данными.
+        return db not in replicas()
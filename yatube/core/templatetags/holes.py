@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from .. import holes
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(name, **kwargs):
+    """Метка фрагмента посетителя: {% hole 'header' query=query %}."""
+    return mark_safe(holes.marker(name, kwargs))
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache.sqlite import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_delete(self):
+        """Базовые операции и общий файл для разных экземпляров"""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.make_cache().get('key'), {'value': 1})
+        self.assertTrue(self.cache.has_key('key'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_expiration_and_add(self):
+        """Просроченные записи не отдаются, add не перезаписывает"""
+        self.cache.set('expired', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 'new'))
+        self.assertFalse(self.cache.add('expired', 'newer'))
+        self.assertEqual(self.cache.get('expired'), 'new')
+        self.assertTrue(self.cache.touch('expired', timeout=-1))
+        self.assertFalse(self.cache.has_key('expired'))
+
+    def test_many(self):
+        """get_many / set_many / delete_many одним запросом"""
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['c']), {})
+
+    def test_incr_is_atomic(self):
+        """incr из нескольких потоков не теряет приращений"""
+        self.cache.set('counter', 0)
+        threads_num, increments = 4, 50
+
+        def worker():
+            cache = self.make_cache()
+            for _ in range(increments):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_num)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), threads_num * increments)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction_by_entries(self):
+        """При превышении MAX_ENTRIES вытесняются давно не читанные"""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache._connection().execute(
+            "UPDATE cache_entries SET accessed = 0 WHERE key LIKE '%b'")
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_many(['a', 'c', 'd']), {
+            'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_eviction_by_size(self):
+        """Суммарный размер не превышает MAX_SIZE"""
+        cache = self.make_cache(MAX_SIZE=5000)
+        for index in range(10):
+            cache.set(f'key{index}', 'x' * 1000)
+        size = cache._connection().execute(
+            'SELECT SUM(size) FROM cache_entries').fetchone()[0]
+        self.assertLessEqual(size, 5000)
+        self.assertEqual(cache.get('key9'), 'x' * 1000)
+
+    def test_get_does_not_wait_for_writer(self):
+        """Чтение под чужой записью не ждёт busy timeout ради LRU"""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache._connection().execute(
+            'UPDATE cache_entries SET accessed = 0')
+        writer = self.make_cache()._connection()
+        writer.execute('BEGIN IMMEDIATE')
+        self.addCleanup(writer.close)
+        started = time.perf_counter()
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.assertLess(time.perf_counter() - started, 0.5)
+        writer.execute('ROLLBACK')
+        self.cache.get('a')
+        accessed = self.cache._connection().execute(
+            "SELECT accessed FROM cache_entries WHERE key LIKE '%a'"
+        ).fetchone()[0]
+        self.assertGreater(accessed, 0)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..db import apply_pragmas, configure_sqlite
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 2 ** 20,
+    'cache_size': -2000,
+    'busy_timeout': 1234,
+}
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+class SQLitePragmasTests(TestCase):
+    def test_connection_is_configured(self):
+        """Соединение Django открыто с PRAGMA из SQLITE_PRAGMAS"""
+        with connection.cursor() as cursor:
+            self.assertEqual(pragma(cursor, 'synchronous'), 1)
+            self.assertEqual(
+                pragma(cursor, 'cache_size'),
+                settings.SQLITE_PRAGMAS['cache_size'])
+            self.assertEqual(
+                pragma(cursor, 'busy_timeout'),
+                settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+class ApplyPragmasTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def test_file_database_switches_to_wal(self):
+        """Файловая база переходит в WAL, и режим переживает соединение"""
+        database = sqlite3.connect(self.path, isolation_level=None)
+        apply_pragmas(database, PRAGMAS)
+        database.close()
+        database = sqlite3.connect(self.path)
+        cursor = database.cursor()
+        self.assertEqual(pragma(cursor, 'journal_mode'), 'wal')
+        self.assertEqual(pragma(cursor, 'mmap_size'), 0)
+        database.close()
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_hook_reads_settings(self):
+        """Обработчик connection_created берёт PRAGMA из настроек"""
+        database = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(database.close)
+        configure_sqlite(sender=None, connection=SimpleNamespace(
+            vendor='sqlite', connection=database))
+        cursor = database.cursor()
+        self.assertEqual(pragma(cursor, 'cache_size'), -2000)
+        self.assertEqual(pragma(cursor, 'busy_timeout'), 1234)
+
+    def test_bench_sqlite(self):
+        """bench_sqlite печатает строку на каждый профиль"""
+        out = StringIO()
+        call_command(
+            'bench_sqlite', '--duration', '0.2', '--rows', '200',
+            '--readers', '1', '--writers', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].startswith('production'))
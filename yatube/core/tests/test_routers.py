@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+from ..routers import PIN_COOKIE
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Две SQLite-базы: основная тестовая и файл-реплика, который
+    «догоняет» основную только по вызову replicate().
+    """
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.directory, 'replica.sqlite3'),
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        del connections[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group)
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.replicate()
+
+    def replicate(self):
+        for alias in ('default', REPLICA):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(
+            connections[REPLICA].connection)
+
+    def count_queries(self, client, urls):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            for url in urls:
+                cache.clear()
+                self.assertEqual(client.get(url).status_code, 200)
+        return len(primary), len(replica)
+
+    def test_read_views_use_replica(self):
+        """Страницы ленты читают с реплики, основная база не нагружается"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        ]
+        with override_settings(DATABASE_REPLICAS=[]):
+            baseline, _ = self.count_queries(self.guest, urls)
+        primary, replica = self.count_queries(self.guest, urls)
+        self.assertGreater(baseline, 0)
+        self.assertEqual(primary, 0)
+        self.assertEqual(replica, baseline)
+
+    def test_replica_lag_is_visible_to_others(self):
+        """Пока реплика не догнала основную базу, гость видит её данные"""
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
+        self.replicate()
+        cache.clear()
+        response = self.guest.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+
+    def test_writer_reads_own_writes(self):
+        """После записи автор закреплён за основной базой и видит свой пост"""
+        response = self.author_client.post(
+            reverse('posts:create_post'), {'text': 'Свежий пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(Post.objects.using(REPLICA).count(), 1)
+        self.assertEqual(Post.objects.using('default').count(), 2)
+        profile = reverse('posts:profile', args=(self.author.username,))
+        self.assertContains(self.author_client.get(profile), 'Свежий пост')
+        cache.clear()
+        self.assertNotContains(self.guest.get(profile), 'Свежий пост')
+
+    @override_settings(DATABASE_REPLICA_PIN_SECONDS=1)
+    def test_page_from_lagging_replica_is_not_kept(self):
+        """
+        Страница, которую гость первым получил с отстающей реплики, не
+        прячет пост ни от автора, ни от остальных дольше закрепления
+        """
+        self.author_client.post(
+            reverse('posts:create_post'), {'text': 'Свежий пост'})
+        profile = reverse('posts:profile', args=(self.author.username,))
+        lagging = self.guest.get(profile)
+        self.assertNotContains(lagging, 'Свежий пост')
+        self.assertEqual(lagging['Cache-Control'], 'no-cache')
+        self.replicate()
+        self.assertContains(self.author_client.get(profile), 'Свежий пост')
+        time.sleep(1.1)
+        response = self.guest.get(
+            profile, HTTP_IF_NONE_MATCH=lagging['ETag'])
+        self.assertContains(response, 'Свежий пост')
+
+    def test_follow_feed_after_follow(self):
+        """Подписка сразу видна в ленте подписок подписавшегося"""
+        reader = User.objects.create_user(username='reader')
+        self.replicate()
+        client = Client()
+        client.force_login(reader)
+        client.get(reverse('posts:profile_follow', args=('author',)))
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Старый пост')
+
+    def test_reads_without_replica_views_stay_on_primary(self):
+        """Страницы без use_replica не читают с реплики"""
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.author_client.get(reverse('posts:create_post'))
+        self.assertEqual(len(replica), 0)
+        self.assertNotIn(PIN_COOKIE, self.guest.get(
+            reverse('posts:index')).cookies)
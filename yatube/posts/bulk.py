@@ -0,0 +1,103 @@
+"""
+Массовая запись строк пачками для служебных команд (seed, импорт).
+
+bulk_create не вызывает сигналы, поэтому после массовой записи
+счётчики, ленты и версии кэша нужно привести в порядок —
+см. finish_bulk_load.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import counters, feed
+from .cache import bump_version
+from .models import Group
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def batches(iterable, size):
+    """Режет поток на списки по size элементов, не читая его целиком."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def preserve_auto_now(model, *field_names):
+    """
+    Временно отключает auto_now_add/auto_now у полей, чтобы bulk_create
+    записал переданные даты, а не текущее время.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now_add, field.auto_now) for field in fields]
+    for field in fields:
+        field.auto_now_add = field.auto_now = False
+    try:
+        yield
+    finally:
+        for field, (auto_now_add, auto_now) in zip(fields, saved):
+            field.auto_now_add, field.auto_now = auto_now_add, auto_now
+
+
+def bulk_insert(model, objects, batch_size, ignore_conflicts=False):
+    """
+    bulk_create по batch_size строк в транзакции; возвращает число строк.
+    Размер одного INSERT Django подбирает сам под лимит параметров СУБД.
+    """
+    created = 0
+    for batch in batches(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(
+                batch, ignore_conflicts=ignore_conflicts)
+        created += len(batch)
+    return created
+
+
+def finish_bulk_load(user_ids=(), group_ids=(), post_ids=(),
+                     feed_user_ids=()):
+    """
+    Пересчитывает счётчики, пересобирает ленты feed_user_ids и сбрасывает
+    кэш страниц после bulk_create: главной, а также авторов, групп
+    и постов, в которые добавлялись строки.
+    """
+    fixed = counters.reconcile_counters()
+    fixed['feeds'] = feed.rebuild_feeds(feed_user_ids)
+    bump_pages(user_ids, group_ids, post_ids)
+    return fixed
+
+
+def finish_batch(user_ids=(), group_ids=(), post_ids=(), feed_user_ids=()):
+    """
+    То же, что finish_bulk_load, но счётчики пересчитываются только
+    у затронутых авторов и постов — для долгой загрузки, которая
+    приводит всё в порядок после каждой пачки.
+    """
+    fixed = counters.reconcile_rows(user_ids, post_ids)
+    fixed['feeds'] = feed.rebuild_feeds(feed_user_ids)
+    bump_pages(user_ids, group_ids, post_ids)
+    return fixed
+
+
+def bump_pages(user_ids=(), group_ids=(), post_ids=()):
+    """Сбрасывает кэш главной и страниц авторов, групп и постов."""
+    bump_version('posts')
+    bump_version('page:index')
+    for batch in batches(user_ids, BATCH_SIZE):
+        for user_id, username in User.objects.filter(
+                id__in=batch).values_list('id', 'username'):
+            bump_version(f'page:profile:{username}')
+            bump_version(f'page:author:{user_id}')
+    for batch in batches(group_ids, BATCH_SIZE):
+        for slug in Group.objects.filter(
+                id__in=batch).values_list('slug', flat=True):
+            bump_version(f'page:group:{slug}')
+    for post_id in post_ids:
+        bump_version(f'page:post:{post_id}')
@@ -0,0 +1,299 @@
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from core.routers import on_replica, pinned, replicas
+
+VERSION_KEY = 'version:{namespace}'
+# Есть, пока реплики могут не видеть запись, сдвинувшую версию.
+BUMPED_KEY = '{key}:bumped'
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+PAGE_KEY = 'page:{view}:{url}'
+LOCK_KEY = '{key}:lock'
+METRIC_KEY = 'page_cache:metrics:{name}'
+METRICS = ('renders', 'early_refreshes', 'stale_serves', 'lock_waits',
+           'lock_timeouts')
+# Сколько после истечения устаревшую страницу ещё можно отдавать,
+# пока её перерисовывает другой запрос.
+PAGE_STALE_TIMEOUT = 60 * 60
+# Дольше этого рендер не держит блокировку, даже если упал процесс.
+LOCK_TIMEOUT = 30
+# Сколько ждёт запрос, если страницы в кэше нет совсем, а её уже рисуют.
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.02
+# β вероятностного раннего обновления: чем больше, тем раньше.
+EARLY_REFRESH_BETA = 1.0
+
+
+def version_key(namespace):
+    return VERSION_KEY.format(namespace=quote(namespace))
+
+
+def get_version(namespace):
+    """
+    Текущая версия пространства ключей. Начальное значение берётся
+    от времени, чтобы после вытеснения ключа версии старые записи
+    не всплыли снова.
+    """
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Делает недействительными все ключи пространства разом."""
+    key = version_key(namespace)
+    if replicas():
+        cache.set(BUMPED_KEY.format(key=key), 1,
+                  settings.DATABASE_REPLICA_PIN_SECONDS)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, None)
+        return version
+
+
+def recently_bumped(namespaces):
+    """Сдвигалась ли версия пространств за время закрепления клиента."""
+    return bool(cache.get_many([
+        BUMPED_KEY.format(key=version_key(namespace))
+        for namespace in namespaces
+    ]))
+
+
+def resolve_namespaces(namespaces, request, kwargs):
+    """
+    Пространства страницы: строки с подстановкой аргументов view или
+    одна функция (request, **kwargs), которая возвращает их список
+    (None — не кэшировать).
+    """
+    if len(namespaces) == 1 and callable(namespaces[0]):
+        return namespaces[0](request, **kwargs)
+    return [namespace.format(**kwargs) for namespace in namespaces]
+
+
+def record(name):
+    """Увеличивает счётчик метрики кэша страниц name."""
+    key = METRIC_KEY.format(name=name)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def page_cache_metrics():
+    """Счётчики кэша страниц: рендеры, ранние обновления, stale, ожидания."""
+    values = cache.get_many(
+        [METRIC_KEY.format(name=name) for name in METRICS])
+    return {
+        name: values.get(METRIC_KEY.format(name=name), 0)
+        for name in METRICS
+    }
+
+
+def reset_page_cache_metrics():
+    cache.delete_many([METRIC_KEY.format(name=name) for name in METRICS])
+
+
+def refresh_early(entry, now, beta=EARLY_REFRESH_BETA):
+    """
+    Вероятностное раннее истечение (XFetch): чем ближе срок и чем
+    дольше рисовалась страница, тем вероятнее обновить её заранее.
+    Так обновление размазано по запросам, а не приходится на один миг.
+    """
+    return now - entry['delta'] * beta * math.log(
+        1 - random.random()) >= entry['expires']
+
+
+def cacheable(request, response):
+    return (
+        request.method in ('GET', 'HEAD')
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def render_and_store(request, key, lock, versions, timeout, render):
+    started = time.time()
+    try:
+        response = render()
+        if cacheable(request, response):
+            now = time.time()
+            cache.set(key, {
+                'versions': versions,
+                'response': response,
+                'expires': now + timeout,
+                'delta': now - started,
+            }, timeout + PAGE_STALE_TIMEOUT)
+        record('renders')
+        return response
+    finally:
+        cache.delete(lock)
+
+
+def wait_for_entry(key, lock, versions):
+    """
+    Ждёт, пока страницу нарисует запрос, взявший блокировку. Если
+    блокировка снята, а страницы нет (404, ответ не для кэша), ждать
+    нечего: запрос рисует сам.
+    """
+    record('lock_waits')
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        # Блокировка снимается после записи страницы, поэтому сначала
+        # блокировка, потом страница: снятая блокировка и пустой кэш
+        # значат, что страницы не будет.
+        locked = cache.get(lock) is not None
+        entry = cache.get(key)
+        if entry is not None and entry['versions'] == versions:
+            return entry
+        if not locked:
+            return None
+    record('lock_timeouts')
+    return None
+
+
+def own_etag(response, versions, kind):
+    """
+    ETag вокруг кэша (condition) считается по текущим версиям и совпал
+    бы с ETag новой страницы: клиент, получивший под ним страницу,
+    которая может оказаться старой, получал бы на новую 304 и так и
+    оставался со старой. Такой странице нужен свой ETag, а no-cache
+    заставляет браузер перепроверить её.
+    """
+    versions = '.'.join(str(version) for version in versions)
+    response['ETag'] = quote_etag(
+        hashlib.md5(f'{kind}.{versions}'.encode()).hexdigest())
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def stale_response(entry):
+    """Страница прежних версий, см. own_etag."""
+    return own_etag(entry['response'], entry['versions'], 'stale')
+
+
+def fetch_page(request, key, versions, timeout, render):
+    """
+    Страница из кэша с stale-while-revalidate и защитой от лавины
+    промахов: рисует её только запрос, взявший блокировку в кэше
+    (cache.add), остальные тем временем получают прежнюю версию. Если
+    прежней нет совсем, они недолго ждут результата, а не идут в базу.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    fresh = entry is not None and entry['versions'] == versions
+    if fresh and not refresh_early(entry, now):
+        return entry['response']
+    lock = LOCK_KEY.format(key=key)
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        if fresh and now < entry['expires']:
+            record('early_refreshes')
+        return render_and_store(
+            request, key, lock, versions, timeout, render)
+    if entry is not None:
+        if not (fresh and now < entry['expires']):
+            record('stale_serves')
+        if not fresh:
+            return stale_response(entry)
+        return entry['response']
+    entry = wait_for_entry(key, lock, versions)
+    if entry is not None:
+        return entry['response']
+    response = render()
+    record('renders')
+    return response
+
+
+def cache_page_versioned(*namespaces, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Кэш страницы, проверяемый по версиям пространств.
+    Пространства могут ссылаться на аргументы view: 'page:group:{slug}'.
+    Сигналы сдвигают версию, и следующий запрос перерисовывает страницу,
+    а не ждёт TTL; пока он рисует, остальные получают прежнюю (см.
+    fetch_page). Кэш общий для всех посетителей: то, что зависит
+    от пользователя, страница выводит через {% hole %}.
+
+    Клиент, закреплённый за основной базой после записи, кэш не читает
+    и не пополняет. Страница, нарисованная с реплики вскоре после сдвига
+    версии, могла не увидеть запись, которая его вызвала: она хранится
+    не дольше DATABASE_REPLICA_PIN_SECONDS и со своим ETag.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or pinned():
+                return view_func(request, *args, **kwargs)
+            resolved = resolve_namespaces(namespaces, request, kwargs)
+            if resolved is None:
+                return view_func(request, *args, **kwargs)
+            versions = [get_version(namespace) for namespace in resolved]
+            lagging = on_replica() and recently_bumped(resolved)
+            key = PAGE_KEY.format(
+                view=view_func.__name__,
+                url=hashlib.md5(
+                    request.build_absolute_uri().encode()).hexdigest(),
+            )
+
+            def render():
+                response = view_func(request, *args, **kwargs)
+                if lagging:
+                    response = own_etag(response, versions, 'replica')
+                return response
+            page_timeout = timeout
+            if lagging:
+                page_timeout = min(
+                    timeout, settings.DATABASE_REPLICA_PIN_SECONDS)
+            return fetch_page(request, key, versions, page_timeout, render)
+        return _wrapped_view
+    return decorator
+
+
+def page_etag(request, *namespaces):
+    """
+    ETag страницы без рендера: версии пространств, от которых она
+    зависит, и то, что в ней зависит от посетителя — пользователь
+    и CSRF-cookie (токен формы в сохранённой браузером странице должен
+    оставаться действительным).
+    """
+    parts = [str(get_version(namespace)) for namespace in namespaces]
+    parts.append(str(request.user.pk))
+    parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.md5('.'.join(parts).encode()).hexdigest()
+
+
+def versioned_etag(*namespaces):
+    """etag_func для condition; пространства как у cache_page_versioned."""
+    def etag_func(request, *args, **kwargs):
+        return page_etag(request, *(
+            namespace.format(**kwargs) for namespace in namespaces))
+    return etag_func
+
+
+def feed_etag(*namespaces):
+    """
+    etag_func для ответов, общих для всех посетителей (ленты RSS и
+    Atom): в отличие от page_etag, только версии пространств.
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = '.'.join(
+            str(get_version(namespace.format(**kwargs)))
+            for namespace in namespaces
+        )
+        return hashlib.md5(f'feed.{versions}'.encode()).hexdigest()
+    return etag_func
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def increment(queryset, field, delta=1):
+    """Атомарное UPDATE ... SET field = field + delta без чтения строки."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def count_of(model, field):
+    """Подзапрос: сколько строк model ссылаются на внешнюю строку."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'),
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+
+
+AUTHOR_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+POST_COUNTERS = {
+    'comments_count': (Comment, 'post'),
+}
+
+
+def reconcile(queryset, counters):
+    """Пересчитывает разошедшиеся счётчики, возвращает число строк."""
+    actual = {
+        f'actual_{field}': count_of(model, related)
+        for field, (model, related) in counters.items()
+    }
+    drifted = list(queryset.annotate(**actual).exclude(**{
+        field: F(f'actual_{field}') for field in counters
+    }).values_list('pk', flat=True))
+    for start in range(0, len(drifted), BATCH_SIZE):
+        queryset.model.objects.filter(
+            pk__in=drifted[start:start + BATCH_SIZE],
+        ).update(**{
+            field: count_of(model, related)
+            for field, (model, related) in counters.items()
+        })
+    return len(drifted)
+
+
+def reconcile_rows(user_ids=(), post_ids=()):
+    """Как reconcile_counters, но только для авторов и постов по id."""
+    return {
+        'authors': reconcile(AuthorStats.objects.filter(
+            pk__in=list(user_ids)), AUTHOR_COUNTERS),
+        'posts': reconcile(Post.objects.filter(
+            pk__in=list(post_ids)), POST_COUNTERS),
+    }
+
+
+def ensure_author_stats():
+    missing = list(User.objects.filter(
+        stats__isnull=True).values_list('id', flat=True))
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=user_id) for user_id in missing),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def reconcile_counters():
+    """
+    Досоздаёт недостающие AuthorStats и чинит разошедшиеся счётчики.
+    Первичный ключ AuthorStats — id пользователя, поэтому подзапросы
+    по author/user сравниваются с ним напрямую.
+    """
+    created = ensure_author_stats()
+    return {
+        'created': created,
+        'authors': reconcile(AuthorStats.objects.all(), AUTHOR_COUNTERS),
+        'posts': reconcile(Post.objects.all(), POST_COUNTERS),
+    }
@@ -0,0 +1,66 @@
+"""
+Потоковая выгрузка постов в JSONL и CSV.
+
+Строки читаются курсором кусками по EXPORT_CHUNK_SIZE и сразу уходят
+клиенту, поэтому память не зависит от числа постов, а первый байт
+приходит до того, как прочитана вся выборка. Посты идут в порядке
+публикации — этот порядок читается по индексам (author, pub_date),
+(group, pub_date) и pub_date без сортировки. Поля совпадают с полями
+импорта (import_content posts), так что выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ('id', 'author', 'text', 'group', 'pub_date', 'image')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку, не копит."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    """Словари постов с полями EXPORT_FIELDS в порядке публикации."""
+    rows = queryset.order_by('pub_date', 'id').values_list(
+        'id', 'author__username', 'text', 'group__slug', 'pub_date', 'image',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for post_id, author, text, group, pub_date, image in rows:
+        yield {
+            'id': post_id,
+            'author': author,
+            'text': text,
+            'group': group,
+            'pub_date': pub_date.isoformat(),
+            'image': image or None,
+        }
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_response(queryset, fmt, filename):
+    """Потоковый ответ с постами queryset в формате fmt (jsonl или csv)."""
+    lines = jsonl_lines if fmt == 'jsonl' else csv_lines
+    response = StreamingHttpResponse(
+        lines(export_rows(queryset)), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{fmt}"')
+    return response
@@ -0,0 +1,150 @@
+import heapq
+from collections import OrderedDict, defaultdict
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 500
+# Сколько строк (pub_date, id) свежих постов авторов rebuild_feeds
+# держит в памяти между пачками подписчиков.
+LATEST_CACHE_ROWS = 200000
+
+
+TRIM_SQL = (
+    'DELETE FROM {table} WHERE id IN ('
+    'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+    'PARTITION BY user_id ORDER BY pub_date DESC, id DESC) AS position '
+    'FROM {table} WHERE user_id IN ({users})) WHERE position > %s)'
+)
+
+
+def trim_feeds(user_ids):
+    """
+    Оставляет в лентах пользователей только POSTS_FEED_SIZE самых свежих
+    записей: переполненные ленты находятся одним GROUP BY на пачку,
+    лишнее удаляется одним DELETE с оконной нумерацией.
+    """
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        overfull = list(FeedEntry.objects.filter(
+            user_id__in=user_ids[start:start + BATCH_SIZE],
+        ).order_by().values('user_id').annotate(
+            entries=Count('id'),
+        ).filter(entries__gt=settings.POSTS_FEED_SIZE).values_list(
+            'user_id', flat=True))
+        if not overfull:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(TRIM_SQL.format(
+                table=FeedEntry._meta.db_table,
+                users=', '.join(['%s'] * len(overfull)),
+            ), [*overfull, settings.POSTS_FEED_SIZE])
+
+
+def trim_feed(user_id):
+    trim_feeds([user_id])
+
+
+def add_to_feed(user_id, posts):
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(id=post_id).only(
+        'id', 'pub_date', 'author_id').first()
+    if post is None:
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post.id, pub_date=post.pub_date)
+         for user_id in followers),
+        ignore_conflicts=True,
+    )
+    trim_feeds(followers)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('id', 'pub_date')[:settings.POSTS_FEED_SIZE]
+    with transaction.atomic():
+        add_to_feed(user_id, posts)
+        trim_feed(user_id)
+
+
+def remove_from_feed(user_id, author_id):
+    """
+    Убирает из ленты посты автора после отписки. Если лента была
+    заполнена до предела, более старые посты других авторов могли быть
+    обрезаны раньше — тогда лента пересобирается.
+    """
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    was_full = entries.count() >= settings.POSTS_FEED_SIZE
+    entries.filter(post__author_id=author_id).delete()
+    if was_full:
+        rebuild_feed(user_id)
+
+
+def rebuild_feed(user_id):
+    """Собирает ленту пользователя заново по текущим подпискам."""
+    posts = Post.objects.filter(
+        author__following__user_id=user_id,
+    ).order_by('-pub_date').values_list(
+        'id', 'pub_date')[:settings.POSTS_FEED_SIZE]
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        add_to_feed(user_id, posts)
+
+
+def rebuild_feeds(user_ids):
+    """
+    Собирает заново ленты многих пользователей сразу. Свежие посты
+    автора читаются из базы и держатся в LRU-кэше не больше
+    LATEST_CACHE_ROWS строк: популярные авторы читаются один раз на всех
+    подписчиков, а память не растёт с числом авторов. Ленты сливаются
+    из этих списков в памяти. Возвращает число лент.
+    """
+    user_ids = list(user_ids)
+    cached = OrderedDict()
+    rows = 0
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        following = defaultdict(list)
+        for user_id, author_id in Follow.objects.filter(
+                user_id__in=batch).values_list('user_id', 'author_id'):
+            following[user_id].append(author_id)
+        latest = {}
+        for author_id in set(chain.from_iterable(following.values())):
+            if author_id in cached:
+                cached.move_to_end(author_id)
+            else:
+                cached[author_id] = list(Post.objects.filter(
+                    author_id=author_id,
+                ).order_by('-pub_date', '-id').values_list(
+                    'pub_date', 'id')[:settings.POSTS_FEED_SIZE])
+                rows += len(cached[author_id])
+            latest[author_id] = cached[author_id]
+        while rows > LATEST_CACHE_ROWS:
+            rows -= len(cached.popitem(last=False)[1])
+        entries = [
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for user_id, authors in following.items()
+            for pub_date, post_id in islice(heapq.merge(
+                *(latest[author_id] for author_id in authors),
+                reverse=True,
+            ), settings.POSTS_FEED_SIZE)
+        ]
+        with transaction.atomic():
+            FeedEntry.objects.filter(user_id__in=batch).delete()
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(user_ids)
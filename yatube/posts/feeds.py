@@ -0,0 +1,133 @@
+"""
+Ленты RSS и Atom: главная, группа и автор.
+
+Ответ ленты кэшируется целиком по версионированному ключу тех же
+пространств, что и HTML-страница (сигналы сдвигают версию при
+сохранении поста), и отдаётся с ETag из этих версий. Лента не зависит
+от посетителя, поэтому её кэш и ETag общие для всех: опрос без
+изменений обходится ответом 304 без обращения к базе.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .cache import cache_page_versioned, feed_etag
+from .models import Group, Post
+
+User = get_user_model()
+
+FEED_ITEMS = 20
+ITEM_TITLE_WORDS = 10
+
+
+class PostsFeed(Feed):
+    """Общая часть лент: последние FEED_ITEMS постов."""
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(ITEM_TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.id,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return (item.group.title,) if item.group else ()
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Последние обновления на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+    def title(self, obj):
+        return f'Yatube: записи сообщества {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+    def title(self, obj):
+        return f'Yatube: посты {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Последние посты пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = Atom1Feed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(feed_class, namespace):
+    """View ленты с кэшем и ETag по версии пространства namespace."""
+    feed = feed_class()
+
+    def view(request, **kwargs):
+        return feed(request, **kwargs)
+    view.__name__ = feed_class.__name__
+    return condition(etag_func=feed_etag(namespace))(
+        cache_page_versioned(namespace)(view))
+
+
+index_rss = cached_feed(IndexFeed, 'page:index')
+index_atom = cached_feed(IndexAtomFeed, 'page:index')
+group_rss = cached_feed(GroupFeed, 'page:group:{slug}')
+group_atom = cached_feed(GroupAtomFeed, 'page:group:{slug}')
+author_rss = cached_feed(AuthorFeed, 'page:profile:{username}')
+author_atom = cached_feed(AuthorAtomFeed, 'page:profile:{username}')
@@ -1,10 +1,36 @@
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
 from .models import Comment, Post
+from .uploads import normalize, open_header
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл, обрезанный обработчиком загрузки, в поле не передаётся:
+        # ImageField иначе сообщил бы, что файл пустой.
+        self.image_too_large = getattr(
+            self.files.get('image'), 'oversized', False)
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_too_large:
+            raise ValidationError(
+                _('Файл больше %(limit)d МБ.'),
+                code='file_too_large',
+                params={'limit': settings.POSTS_UPLOAD_MAX_SIZE // 2 ** 20},
+            )
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        return normalize(image, open_header(image))
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -0,0 +1,92 @@
+"""
+Кэш отрендеренных карточек постов в списках.
+
+Ключ карточки — id поста и версия правки: хэш всего, что карточка
+показывает (текст, дата, картинка, группа, автор), и исходников шаблона
+вместе со всеми подключёнными в нём. Правка поста, переименование группы
+или автора, новая разметка карточки после выкладки дают новый ключ, так
+что карточку не нужно сбрасывать, а старая просто истекает.
+Карточки страницы читаются одним get_many; рендерятся и записываются
+одним set_many только недостающие.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.template.library import InclusionNode
+from django.template.loader import get_template
+from django.template.loader_tags import IncludeNode
+
+from . import thumbnails
+from .cache import PAGE_CACHE_TIMEOUT
+
+CARD_KEY = 'card:{post_id}:{version}'
+
+
+@lru_cache(maxsize=None)
+def template_digest(template_name):
+    """
+    Хэш исходника шаблона и шаблонов, которые он подключает через
+    {% include %} и inclusion-теги. Шаблоны меняются только с выкладкой,
+    поэтому считается один раз на процесс.
+    """
+    template = get_template(template_name).template
+    digest = hashlib.md5(template.source.encode())
+    nodes = template.nodelist.get_nodes_by_type(IncludeNode)
+    nodes += template.nodelist.get_nodes_by_type(InclusionNode)
+    for node in nodes:
+        name = getattr(node, 'filename', None) or node.template.var
+        if isinstance(name, str):
+            digest.update(template_digest(name).encode())
+    return digest.hexdigest()
+
+
+def card_version(post, template_name):
+    """Версия правки карточки post в шаблоне template_name."""
+    group = post.group
+    parts = [
+        template_name,
+        template_digest(template_name),
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name or '',
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+    ]
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()
+
+
+def card_key(post, template_name):
+    return CARD_KEY.format(
+        post_id=post.id, version=card_version(post, template_name))
+
+
+def render_cards(posts, template_name):
+    """HTML карточек posts в их порядке, из кэша или отрендеренные."""
+    posts = list(posts)
+    keys = [card_key(post, template_name) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {
+        key: post for key, post in zip(keys, posts) if key not in cached
+    }
+    if missing:
+        template = get_template(template_name)
+        rendered = {
+            key: template.render({'post': post})
+            for key, post in missing.items()
+        }
+        cached.update(rendered)
+        # Пока миниатюры не нарезаны, карточка показывает исходную
+        # картинку: такую не кэшируем, чтобы srcset появился сразу.
+        ready = cache.get_many([
+            thumbnails.VARIANTS_KEY.format(name=post.image.name)
+            for post in missing.values() if post.image
+        ])
+        cache.set_many({
+            key: html for key, html in rendered.items()
+            if not missing[key].image or thumbnails.VARIANTS_KEY.format(
+                name=missing[key].image.name) in ready
+        }, PAGE_CACHE_TIMEOUT)
+    return [cached[key] for key in keys]
@@ -0,0 +1,29 @@
+"""Фрагменты страниц постов, зависящие от посетителя (см. core.holes)."""
+from core.holes import register
+
+from .forms import CommentForm
+from .models import Follow
+
+
+@register('index_switcher', 'includes/index_switcher.html')
+def index_switcher(request):
+    return {}
+
+
+@register('follow_button', 'includes/follow_button.html')
+def follow_button(request, author):
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author__username=author).exists()
+    )
+    return {'author': author, 'following': following}
+
+
+@register('post_actions', 'includes/post_actions.html')
+def post_actions(request, post_id, author_id):
+    return {
+        'post_id': post_id,
+        'is_author': request.user.id == author_id,
+        'form': CommentForm(),
+    }
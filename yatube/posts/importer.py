@@ -0,0 +1,308 @@
+"""
+Потоковый импорт постов, комментариев и подписок из JSONL и CSV.
+
+Файл читается построчно и пишется пачками через bulk_create, так что
+память не растёт с размером файла. Авторы, группы и посты ищутся одним
+запросом на пачку и держатся в ограниченном LRU-кэше. После каждой
+пачки в файл контрольной точки записывается, сколько записей уже
+обработано, и наибольший id в таблице: прерванный импорт продолжается
+с этого места.
+
+Счётчики, ленты и кэш страниц, затронутых пачкой, чинятся сразу после
+её коммита и до контрольной точки, так что продолженный импорт не
+зависит от того, что помнил прерванный. Если запуск упал между коммитом
+пачки и контрольной точкой, пачка повторяется: её строки, уже
+записанные в базу, узнаются по полям среди строк новее контрольной
+точки и второй раз не пишутся.
+"""
+import csv
+import json
+import os
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bulk import batches, bulk_insert, finish_batch, preserve_auto_now
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+LOOKUP_SIZE = 10000
+LOOKUP_BATCH_SIZE = 500
+FORMATS = ('jsonl', 'csv')
+# По этим полям повторённая пачка узнаёт уже записанные строки.
+# Подписки пишутся с ignore_conflicts и повторяются без дублей и так.
+NATURAL_KEYS = {
+    'posts': ('author_id', 'group_id', 'text'),
+    'comments': ('post_id', 'author_id', 'text'),
+}
+
+
+class SkipRecord(ValueError):
+    """Запись не импортируется; текст исключения — причина."""
+
+
+class Lookup:
+    """
+    Значение key_field -> id для строк model. Недостающие ключи
+    пачки догружаются одним запросом, кэш ограничен maxsize
+    записями, самые давние вытесняются.
+    """
+
+    def __init__(self, model, key_field, maxsize=LOOKUP_SIZE):
+        self.model = model
+        self.key_field = key_field
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+
+    def prefetch(self, keys):
+        missing = list({
+            key for key in keys if key is not None and key not in self.cache
+        })
+        for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            chunk = missing[start:start + LOOKUP_BATCH_SIZE]
+            found = dict(self.model.objects.filter(**{
+                f'{self.key_field}__in': chunk,
+            }).values_list(self.key_field, 'id'))
+            for key in chunk:
+                self.remember(key, found.get(key))
+
+    def remember(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def get(self, key):
+        if key not in self.cache:
+            self.prefetch([key])
+        self.cache.move_to_end(key)
+        return self.cache[key]
+
+
+def read_records(path, fmt=None):
+    """
+    Записи файла по одной: словари из строк JSONL или CSV. Пустые
+    строки JSONL пропускаются, пустые ячейки CSV превращаются в None.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат файла: {fmt}')
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            for row in csv.DictReader(source):
+                yield {key: value or None for key, value in row.items()}
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_date(value):
+    """Дата из ISO 8601; без часового пояса считается текущим поясом."""
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise SkipRecord(f'неверная дата {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def required(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        raise SkipRecord(f'не заполнено поле {field}')
+    return value
+
+
+def found(lookup, key, name):
+    value = lookup.get(key)
+    if value is None:
+        raise SkipRecord(f'не найдено: {name} {key!r}')
+    return value
+
+
+class Importer:
+    """
+    Импорт записей одного вида: kind — posts, comments или follows.
+    Поля записей:
+    posts — author, text, group (slug), pub_date, image, id;
+    comments — post (id), author, text, created;
+    follows — user, author (имена пользователей).
+    last_id — наибольший id из контрольной точки: первая пачка
+    продолженного импорта не повторит строки новее него.
+    """
+
+    KINDS = ('posts', 'comments', 'follows')
+
+    def __init__(self, kind, last_id=None):
+        if kind not in self.KINDS:
+            raise ValueError(f'Неизвестный вид записей: {kind}')
+        self.kind = kind
+        self.model = {
+            'posts': Post, 'comments': Comment, 'follows': Follow,
+        }[kind]
+        self.resumed = last_id is not None
+        self.last_id = last_id if self.resumed else self.max_id()
+        self.users = Lookup(User, 'username')
+        self.groups = Lookup(Group, 'slug')
+        self.posts = Lookup(Post, 'id')
+        self.build = {
+            'posts': self.build_post,
+            'comments': self.build_comment,
+            'follows': self.build_follow,
+        }[kind]
+
+    def max_id(self):
+        return self.model.objects.aggregate(last=Max('id'))['last'] or 0
+
+    def prefetch(self, records):
+        if self.kind == 'follows':
+            self.users.prefetch(
+                record.get(field) for record in records
+                for field in ('user', 'author'))
+            return
+        self.users.prefetch(record.get('author') for record in records)
+        if self.kind == 'posts':
+            self.groups.prefetch(
+                record['group'] for record in records if record.get('group'))
+        else:
+            self.posts.prefetch(
+                int(record['post']) for record in records
+                if str(record.get('post') or '').isdigit())
+
+    def build_post(self, record):
+        author_id = found(self.users, required(record, 'author'), 'автор')
+        group_id = None
+        if record.get('group'):
+            group_id = found(self.groups, record['group'], 'группа')
+        post = Post(
+            text=required(record, 'text'),
+            author_id=author_id,
+            group_id=group_id,
+            image=record.get('image') or '',
+            pub_date=parse_date(record.get('pub_date')),
+        )
+        if record.get('id'):
+            post.id = int(record['id'])
+        return post
+
+    def build_comment(self, record):
+        post = required(record, 'post')
+        if not str(post).isdigit():
+            raise SkipRecord(f'неверный id поста {post!r}')
+        return Comment(
+            post_id=found(self.posts, int(post), 'пост'),
+            author_id=found(self.users, required(record, 'author'), 'автор'),
+            text=required(record, 'text'),
+            created=parse_date(record.get('created')),
+        )
+
+    def build_follow(self, record):
+        user_id = found(self.users, required(record, 'user'), 'пользователь')
+        author_id = found(self.users, required(record, 'author'), 'автор')
+        if user_id == author_id:
+            raise SkipRecord('подписка на самого себя')
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def unwritten(self, objects):
+        """
+        Объекты повторённой пачки без тех, что прерванный запуск уже
+        записал: строк с теми же полями и id новее контрольной точки
+        или с тем же явным id.
+        """
+        fields = NATURAL_KEYS.get(self.kind)
+        if fields is None:
+            return objects
+        ids = {obj.id for obj in objects if obj.id is not None}
+        rows = self.model.objects.filter(
+            Q(id__gt=self.last_id) | Q(id__in=ids),
+        ).values_list('id', *fields)
+        by_id = {}
+        fresh = Counter()
+        for row_id, *key in rows:
+            if row_id in ids:
+                by_id[row_id] = tuple(key)
+            else:
+                fresh[tuple(key)] += 1
+        left = []
+        for obj in objects:
+            key = tuple(getattr(obj, field) for field in fields)
+            if obj.id is not None:
+                if by_id.get(obj.id) == key:
+                    continue
+            elif fresh[key]:
+                fresh[key] -= 1
+                continue
+            left.append(obj)
+        return left
+
+    def write(self, objects, batch_size):
+        if self.kind == 'posts':
+            with preserve_auto_now(Post, 'pub_date'):
+                return bulk_insert(Post, objects, batch_size)
+        if self.kind == 'comments':
+            with preserve_auto_now(Comment, 'created'):
+                return bulk_insert(Comment, objects, batch_size)
+        return bulk_insert(Follow, objects, batch_size, ignore_conflicts=True)
+
+    def run(self, records, batch_size, skip=0, on_batch=None, on_skip=None):
+        """
+        Импортирует записи, начиная с skip-й, пачками по batch_size.
+        После каждой пачки вызывает on_batch(обработано, записано,
+        пропущено), для отброшенной записи — on_skip(номер, причина).
+        """
+        done, written, skipped = skip, 0, 0
+        records = iter(records)
+        for _ in islice(records, skip):
+            pass
+        for batch in batches(records, batch_size):
+            self.prefetch(batch)
+            objects = []
+            for number, record in enumerate(batch, done + 1):
+                try:
+                    objects.append(self.build(record))
+                except (AttributeError, TypeError, ValueError) as error:
+                    skipped += 1
+                    if on_skip is not None:
+                        on_skip(number, error)
+            fresh = objects
+            if self.resumed:
+                fresh = self.unwritten(objects)
+                self.resumed = False
+            written += self.write(fresh, batch_size)
+            written += len(objects) - len(fresh)
+            self.fix_up(objects)
+            self.last_id = self.max_id()
+            done += len(batch)
+            if on_batch is not None:
+                on_batch(done, written, skipped)
+        return done, written, skipped
+
+    def fix_up(self, objects):
+        """Чинит счётчики, ленты и кэш страниц, затронутых пачкой."""
+        if self.kind == 'posts':
+            author_ids = {post.author_id for post in objects}
+            return finish_batch(
+                user_ids=author_ids,
+                group_ids={post.group_id for post in objects} - {None},
+                feed_user_ids=Follow.objects.filter(
+                    author_id__in=author_ids,
+                ).values_list('user_id', flat=True).distinct(),
+            )
+        if self.kind == 'comments':
+            return finish_batch(
+                post_ids={comment.post_id for comment in objects})
+        return finish_batch(
+            user_ids={
+                user_id for follow in objects
+                for user_id in (follow.user_id, follow.author_id)
+            },
+            feed_user_ids={follow.user_id for follow in objects},
+        )
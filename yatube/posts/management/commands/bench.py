@@ -0,0 +1,252 @@
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Post
+
+SCENARIOS = (
+    'index', 'index_deep', 'follow_index', 'post_detail', 'add_comment',
+)
+BENCH_COMMENT = 'Комментарий нагрузочного теста'
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[max(int(len(values) * share) - 1, 0)]
+
+
+def compare(results, baseline, max_slowdown, max_throughput_drop):
+    """
+    Регрессии results относительно baseline: p95/p99 выросли больше чем
+    в 1 + max_slowdown раз или пропускная способность упала больше чем
+    на долю max_throughput_drop. Сценарии, которых нет в baseline,
+    пропускаются.
+    """
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            limit = base[metric] * (1 + max_slowdown)
+            if row[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {row[metric]:.1f} > {limit:.1f}')
+        limit = base['rps'] * (1 - max_throughput_drop)
+        if row['rps'] < limit:
+            regressions.append(
+                f'{name}: rps {row["rps"]:.1f} < {limit:.1f}')
+    return regressions
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: поднимает приложение в этом же процессе '
+        '(WSGI-сервер на свободном порту) и гоняет параллельные запросы '
+        'к горячим страницам. Считает пропускную способность и '
+        'p50/p95/p99, пишет JSON и сравнивает с сохранённым базовым '
+        'прогоном. Сценарий add_comment пишет в базу: комментарии '
+        'удаляются после прогона.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на сценарий.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Запросов на сценарий до замера.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Куда записать JSON с итогами.')
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона; при регрессии команда падает.',
+        )
+        parser.add_argument(
+            '--max-slowdown', type=float, default=0.25,
+            help='Допустимый рост p95 и p99 относительно baseline (доля).',
+        )
+        parser.add_argument(
+            '--max-throughput-drop', type=float, default=0.2,
+            help='Допустимое падение запросов в секунду (доля).',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)['scenarios']
+        targets = self.prepare()
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.address = server.server_address
+        last_comment = Comment.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        results = {}
+        try:
+            self.stdout.write(
+                f'{"scenario":<14} {"req/s":>8} {"p50 ms":>8} '
+                f'{"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+            for name in options['scenarios']:
+                row = self.run_scenario(targets[name], options)
+                results[name] = row
+                self.stdout.write(
+                    f'{name:<14} {row["rps"]:>8.1f} {row["p50_ms"]:>8.1f} '
+                    f'{row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f} '
+                    f'{row["errors"]:>7}')
+        finally:
+            server.shutdown()
+            server.server_close()
+            Comment.objects.filter(
+                id__gt=last_comment, text=BENCH_COMMENT).delete()
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump({
+                    'options': {
+                        key: options[key]
+                        for key in ('concurrency', 'requests', 'seed')
+                    },
+                    'scenarios': results,
+                }, target, indent=2)
+        failed = [name for name, row in results.items() if row['errors']]
+        if failed:
+            raise CommandError(
+                f'Ошибочные ответы в сценариях: {", ".join(failed)}.')
+        if baseline is not None:
+            regressions = compare(
+                results, baseline, options['max_slowdown'],
+                options['max_throughput_drop'])
+            if regressions:
+                raise CommandError(
+                    'Регрессия относительно baseline:\n'
+                    + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(
+                'Регрессий относительно baseline нет.'))
+
+    def prepare(self):
+        """
+        Подбирает данные для сценариев: самого подписанного читателя,
+        самый обсуждаемый пост и глубокие страницы главной.
+        """
+        post = Post.objects.order_by('-comments_count', '-id').first()
+        if post is None:
+            raise CommandError(
+                'В базе нет постов, заполните её: manage.py seed.')
+        stats = AuthorStats.objects.order_by(
+            '-following_count').select_related('user').first()
+        reader = stats.user if stats else post.author
+        session = self.login(reader)
+        pages = max(Post.objects.count() // 10, 1)
+        deep_pages = range(max(pages // 2, 1), pages + 1)
+        post_url = reverse('posts:post_detail', args=(post.id,))
+        comment_url = reverse('posts:add_comment', args=(post.id,))
+        return {
+            'index': lambda rnd: ('GET', reverse('posts:index'), {}, 200),
+            'index_deep': lambda rnd: (
+                'GET',
+                reverse('posts:index') + f'?page={rnd.choice(deep_pages)}',
+                {}, 200),
+            'follow_index': lambda rnd: (
+                'GET', reverse('posts:follow_index'), session, 200),
+            'post_detail': lambda rnd: ('GET', post_url, {}, 200),
+            'add_comment': lambda rnd: (
+                'POST', comment_url, session, 302),
+        }
+
+    def login(self, user):
+        """Cookie сессии и CSRF-токена для запросов от имени user."""
+        client = Client()
+        client.force_login(user)
+        session = client.cookies['sessionid'].value
+        # Форма создания поста ставит cookie csrftoken.
+        client.get(reverse('posts:create_post'))
+        token = client.cookies['csrftoken']
+        return {
+            'Cookie': f'sessionid={session}; csrftoken={token.value}',
+            'X-CSRFToken': token.value,
+        }
+
+    def request(self, method, url, headers):
+        connection = http.client.HTTPConnection(*self.address, timeout=30)
+        body = None
+        headers = dict(headers)
+        if method == 'POST':
+            body = urlencode({'text': BENCH_COMMENT})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            connection.request(method, url, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    def run_scenario(self, target, options):
+        counter = iter(range(options['requests']))
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+
+        def worker(seed):
+            rnd = random.Random(seed)
+            while True:
+                with lock:
+                    if next(counter, None) is None:
+                        return
+                method, url, headers, status = target(rnd)
+                started = time.perf_counter()
+                try:
+                    code = self.request(method, url, headers)
+                except OSError as error:
+                    code = repr(error)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if code != status:
+                        errors.append(code)
+
+        rnd = random.Random(options['seed'])
+        for _ in range(options['warmup']):
+            method, url, headers, _status = target(rnd)
+            self.request(method, url, headers)
+        workers = [
+            threading.Thread(target=worker, args=(options['seed'] + index,))
+            for index in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - started
+        connections.close_all()
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'rps': len(latencies) / wall,
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+        }
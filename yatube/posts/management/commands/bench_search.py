@@ -0,0 +1,117 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import (INSTALL_SQL, REBUILD_SQL, fts_statements,
+                          match_expression)
+
+TABLE = 'bench_post'
+FTS = 'bench_post_fts'
+LIKE_SQL = (
+    f'SELECT id FROM {TABLE} WHERE text LIKE ? '
+    f'ORDER BY pub_date DESC LIMIT ?'
+)
+FTS_SQL = (
+    f'SELECT {TABLE}.id FROM {FTS} JOIN {TABLE} ON {TABLE}.id = {FTS}.rowid '
+    f'WHERE {FTS} MATCH ? ORDER BY bm25({FTS}), pub_date DESC LIMIT ?'
+)
+
+# Диапазоны номеров слов в словаре: частые слова встречаются почти
+# в каждом посте, и LIKE находит первые совпадения сразу, а bm25
+# ранжирует их все; на редких словах LIKE читает всю таблицу.
+BUCKETS = {
+    'частые': (1, 10),
+    'средние': (100, 1000),
+    'редкие': (2000, 5000),
+}
+
+
+def pick_word(rnd, vocabulary):
+    """Частоты слов по закону Ципфа: немного частых, длинный хвост."""
+    return vocabulary[int(rnd.paretovariate(1.1)) % len(vocabulary)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск LIKE %q% и FTS5 с ранжированием bm25 '
+        'на синтетической таблице постов во временном файле SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=30)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def populate(self, db, options):
+        rnd = random.Random(options['seed'])
+        vocabulary = [f'слово{index}' for index in range(options['words'])]
+
+        def rows():
+            for index in range(options['posts']):
+                words = (
+                    pick_word(rnd, vocabulary)
+                    for _ in range(rnd.randint(10, 60))
+                )
+                yield index + 1, ' '.join(words), index
+        db.execute(
+            f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, '
+            f'text TEXT NOT NULL, pub_date INTEGER NOT NULL)')
+        started = time.perf_counter()
+        db.executemany(f'INSERT INTO {TABLE} VALUES (?, ?, ?)', rows())
+        db.execute(f'CREATE INDEX {TABLE}_pub_date ON {TABLE} (pub_date)')
+        db.commit()
+        self.stdout.write(
+            f'Посты: {options["posts"]} за '
+            f'{time.perf_counter() - started:.1f} с')
+        started = time.perf_counter()
+        for sql in fts_statements(INSTALL_SQL + (REBUILD_SQL,), TABLE, FTS):
+            db.execute(sql)
+        db.commit()
+        self.stdout.write(
+            f'Индекс FTS5 за {time.perf_counter() - started:.1f} с')
+        return rnd, vocabulary
+
+    def measure(self, db, sql, params, repeat=3):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='bench-search-')
+        path = os.path.join(directory, 'bench.sqlite3')
+        db = sqlite3.connect(path)
+        try:
+            rnd, vocabulary = self.populate(db, options)
+            rows = []
+            for bucket, (start, stop) in BUCKETS.items():
+                like, fts = [], []
+                for _ in range(options['queries']):
+                    word = vocabulary[rnd.randrange(
+                        start, min(stop, len(vocabulary)))]
+                    like.append(self.measure(
+                        db, LIKE_SQL, (f'%{word}%', options['limit'])))
+                    fts.append(self.measure(db, FTS_SQL, (
+                        match_expression(word), options['limit'])))
+                rows.append((bucket, like, fts))
+        finally:
+            db.close()
+            os.remove(path)
+            os.rmdir(directory)
+        self.stdout.write(
+            f'{"слова":<10} {"LIKE p50":>10} {"FTS5 p50":>10} '
+            f'{"LIKE max":>10} {"FTS5 max":>10}')
+        for bucket, like, fts in rows:
+            self.stdout.write(
+                f'{bucket:<10} {statistics.median(like):>8.2f}ms '
+                f'{statistics.median(fts):>8.2f}ms '
+                f'{max(like):>8.2f}ms {max(fts):>8.2f}ms')
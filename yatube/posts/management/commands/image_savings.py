@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+BASELINE_FORMAT = 'JPEG'
+
+
+def saved(before, after):
+    return (before - after) * 100 / before if before else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает, сколько байт картинок экономят адаптивные варианты '
+        'на страницах главной по сравнению с одной нарезкой 960x339.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument(
+            '--viewport', type=int, default=360,
+            help='Ширина экрана в CSS-пикселях.',
+        )
+        parser.add_argument('--dpr', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        viewport = int(options['viewport'] * options['dpr'])
+        posts = Post.objects.only('image').order_by('-pub_date', '-id')
+        self.stdout.write(
+            f'{"page":>4} {"images":>6} {"before":>10} {"after":>10} '
+            f'{"saved":>6}')
+        total_before = total_after = 0
+        for number in range(options['pages']):
+            start = number * options['per_page']
+            page = posts[start:start + options['per_page']]
+            before = after = images = 0
+            for post in page:
+                if not post.image:
+                    continue
+                ready = thumbnails.get_variants(post.image)
+                if ready is None:
+                    ready = thumbnails.generate(post.image.name)
+                if ready is None:
+                    continue
+                images += 1
+                before += thumbnails.pick(
+                    ready, thumbnails.CARD_SIZE[0], BASELINE_FORMAT)['bytes']
+                after += thumbnails.pick(ready, viewport)['bytes']
+            total_before += before
+            total_after += after
+            self.stdout.write(
+                f'{number + 1:>4} {images:>6} {before:>10} {after:>10} '
+                f'{saved(before, after):>5.0f}%')
+        self.stdout.write(self.style.SUCCESS(
+            f'Итого: {total_before} → {total_after} байт, экономия '
+            f'{saved(total_before, total_after):.0f}% для экрана '
+            f'{viewport}px ({thumbnails.FORMATS[0]})'))
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.importer import FORMATS, Importer, read_records
+
+MAX_SKIP_MESSAGES = 20
+
+
+def load_checkpoint(path, source, kind):
+    """Сколько записей source уже обработано прошлым запуском."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as checkpoint:
+        state = json.load(checkpoint)
+    if state.get('source') != source or state.get('kind') != kind:
+        raise CommandError(
+            f'Контрольная точка {path} относится к другому импорту, '
+            f'удалите её или укажите --checkpoint.')
+    return state
+
+
+def save_checkpoint(path, state):
+    """Пишет контрольную точку атомарно: через временный файл."""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(temporary, path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты, комментарии или подписки из JSONL '
+        'или CSV пачками bulk_create. Прерванный импорт продолжается с '
+        'контрольной точки; даты публикации сохраняются из файла.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=Importer.KINDS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию — по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, по умолчанию <path>.checkpoint.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с начала файла, не глядя на контрольную точку.',
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден.')
+        source = os.path.abspath(path)
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        state = None
+        if not options['restart']:
+            state = load_checkpoint(checkpoint, source, kind)
+        state = state or {
+            'source': source, 'kind': kind,
+            'done': 0, 'written': 0, 'skipped': 0,
+        }
+        if state['done']:
+            self.stdout.write(
+                f'Продолжаем с записи {state["done"] + 1}.')
+        started = time.perf_counter()
+        resumed = state['done']
+        importer = Importer(kind, last_id=state.get('last_id'))
+        # Контрольная точка до первой пачки: если запуск упадёт после
+        # её коммита, повтор узнает записанные строки по last_id.
+        state['last_id'] = importer.last_id
+        save_checkpoint(checkpoint, state)
+        previous = dict(state)
+
+        def on_batch(done, written, skipped):
+            state.update(
+                done=done,
+                last_id=importer.last_id,
+                written=previous['written'] + written,
+                skipped=previous['skipped'] + skipped,
+            )
+            save_checkpoint(checkpoint, state)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'обработано {done:>10}, записано {state["written"]:>10}, '
+                f'пропущено {state["skipped"]:>8} '
+                f'({(done - resumed) / max(elapsed, 1e-9):,.0f} записей/с)')
+
+        shown = []
+
+        def on_skip(number, reason):
+            if len(shown) < MAX_SKIP_MESSAGES:
+                shown.append(number)
+                self.stderr.write(f'Запись {number} пропущена: {reason}')
+
+        try:
+            importer.run(
+                read_records(path, options['format']),
+                options['batch_size'], skip=state['done'],
+                on_batch=on_batch, on_skip=on_skip,
+            )
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(
+                f'Пачка с записи {state["done"] + 1} не записана: {error}. '
+                f'Исправьте файл и запустите команду снова — импорт '
+                f'продолжится с этой пачки.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: записано {state["written"]}, '
+            f'пропущено {state["skipped"]}.'))
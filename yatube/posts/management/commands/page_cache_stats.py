@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import page_cache_metrics, reset_page_cache_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает счётчики кэша страниц: рендеры, ранние обновления, '
+        'отдачи устаревших страниц и ожидания блокировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        for name, value in page_cache_metrics().items():
+            self.stdout.write(f'{name:<16} {value}')
+        if options['reset']:
+            reset_page_cache_metrics()
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.feed import rebuild_feeds
+from posts.models import FeedEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок с нуля по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пересобрать ленты только этих пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            if not users.exists():
+                raise CommandError('Пользователи не найдены.')
+        else:
+            FeedEntry.objects.exclude(
+                user__follower__isnull=False).delete()
+            users = users.filter(follower__isnull=False).distinct()
+        rebuilt = rebuild_feeds(users.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {rebuilt}'))
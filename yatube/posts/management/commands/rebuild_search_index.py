@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.search import install_index, is_available
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт FTS5-индекс постов, если его нет, и заново '
+        'индексирует все тексты.'
+    )
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        install_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {Post.objects.count()}'))
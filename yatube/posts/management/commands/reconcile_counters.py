@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов, комментариев '
+        'и подписок, исправляя расхождения.'
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано счётчиков авторов: {fixed["created"]}, '
+            f'исправлено авторов: {fixed["authors"]}, '
+            f'исправлено постов: {fixed["posts"]}'
+        ))
@@ -0,0 +1,245 @@
+import io
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from PIL import Image
+
+from posts.bulk import bulk_insert, finish_bulk_load, preserve_auto_now
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'сегодня вчера город море лес книга кино музыка кот собака дорога '
+    'утро вечер зима лето осень весна друг работа дом сад чай кофе '
+    'поезд горы река фото новости проект идея код тест релиз'
+).split()
+IMAGE_SIZE = (1280, 720)
+SEED_PASSWORD = 'seed-password'
+
+
+def skewed(rnd, size, skew):
+    """
+    Индекс от 0 до size - 1 со степенным распределением: чем больше
+    skew, тем сильнее выборка прижата к началу (популярным строкам).
+    """
+    return min(int(size * rnd.random() ** skew), size - 1)
+
+
+def sentence(rnd, words_min, words_max):
+    return ' '.join(rnd.choices(
+        WORDS, k=rnd.randint(words_min, words_max))).capitalize()
+
+
+def fake_posts(rnd, number, authors, group_ids, images, image_share, now,
+               period):
+    for _ in range(number):
+        image = ''
+        if images and rnd.random() < image_share:
+            image = rnd.choice(images)
+        yield Post(
+            text=sentence(rnd, 5, 80),
+            author_id=authors[skewed(rnd, len(authors), 3)],
+            group_id=(
+                group_ids[skewed(rnd, len(group_ids), 4)]
+                if group_ids and rnd.random() < 0.7 else None
+            ),
+            image=image,
+            pub_date=now - timedelta(seconds=rnd.random() * period),
+        )
+
+
+def fake_comments(rnd, number, post_ids, user_ids, now, period):
+    if not post_ids:
+        return
+    for _ in range(number):
+        yield Comment(
+            # Обсуждают в основном немногие посты.
+            post_id=post_ids[skewed(rnd, len(post_ids), 4)],
+            author_id=user_ids[rnd.randrange(len(user_ids))],
+            text=sentence(rnd, 2, 30),
+            created=now - timedelta(seconds=rnd.random() * period),
+        )
+
+
+def fake_follows(rnd, number, user_ids, authors):
+    for _ in range(number):
+        user_id = user_ids[rnd.randrange(len(user_ids))]
+        # Степенной закон числа подписчиков: у немногих авторов
+        # их большинство.
+        author_id = authors[skewed(rnd, len(authors), 3)]
+        if user_id != author_id:
+            yield Follow(user_id=user_id, author_id=author_id)
+
+
+def inserted_ids(model, after_id, created):
+    """
+    Первичные ключи только что вставленных строк. SQLite не возвращает их
+    из bulk_create, но при записи одним процессом они идут подряд.
+    """
+    ids = model.objects.filter(id__gt=after_id).order_by('id')
+    first = ids.values_list('id', flat=True).first()
+    if first is None:
+        return range(0)
+    last = ids.values_list('id', flat=True).last()
+    if last - first + 1 != created:
+        raise CommandError(
+            f'{model.__name__}: ключи вставленных строк идут не подряд, '
+            f'в базу пишет кто-то ещё.')
+    return range(first, last + 1)
+
+
+def last_id(model):
+    return model.objects.order_by('-id').values_list(
+        'id', flat=True).first() or 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочных тестов: '
+        'пользователи, группы, посты (по желанию с картинками), '
+        'комментарии и подписки со степенным перекосом популярности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20000,
+            help='Сколько подписок попытаться создать; дубли отбрасываются.',
+        )
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Множитель для всех объёмов разом.',
+        )
+        parser.add_argument(
+            '--authors-share', type=float, default=0.2,
+            help='Доля пользователей, которые пишут посты.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок создать и раздать постам.',
+        )
+        parser.add_argument('--image-share', type=float, default=0.3)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--no-feeds', action='store_true',
+            help=(
+                'Не собирать ленты подписок: при большом POSTS_FEED_SIZE '
+                'это самый долгий шаг.'
+            ),
+        )
+
+    def step(self, name, started, created):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<10} {created:>10} за {elapsed:>6.1f} с '
+            f'({created / max(elapsed, 1e-9):,.0f} строк/с)')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        sizes = {
+            name: max(int(options[name] * scale), 0)
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        if sizes['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом «{prefix}» уже есть, '
+                f'укажите другой --prefix.')
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        total = time.perf_counter()
+
+        started = time.perf_counter()
+        password = make_password(SEED_PASSWORD)
+        after = last_id(User)
+        created = bulk_insert(User, (
+            User(username=f'{prefix}_{index}', password=password)
+            for index in range(sizes['users'])
+        ), batch_size)
+        user_ids = inserted_ids(User, after, created)
+        self.step('users', started, created)
+
+        started = time.perf_counter()
+        after = last_id(Group)
+        created = bulk_insert(Group, (
+            Group(
+                title=f'{prefix} группа {index}',
+                slug=f'{prefix}-group-{index}',
+                description=sentence(rnd, 5, 20),
+            )
+            for index in range(sizes['groups'])
+        ), batch_size)
+        group_ids = inserted_ids(Group, after, created)
+        self.step('groups', started, created)
+
+        images = self.make_images(prefix, options['images'], rnd)
+        authors = user_ids[:max(int(len(user_ids)
+                                    * options['authors_share']), 1)]
+        now = timezone.now()
+        period = timedelta(days=options['days']).total_seconds()
+
+        started = time.perf_counter()
+        after = last_id(Post)
+        with preserve_auto_now(Post, 'pub_date'):
+            created = bulk_insert(Post, fake_posts(
+                rnd, sizes['posts'], authors, group_ids, images,
+                options['image_share'], now, period), batch_size)
+        post_ids = inserted_ids(Post, after, created)
+        self.step('posts', started, created)
+
+        started = time.perf_counter()
+        with preserve_auto_now(Comment, 'created'):
+            created = bulk_insert(Comment, fake_comments(
+                rnd, sizes['comments'], post_ids, user_ids, now, period,
+            ), batch_size)
+        self.step('comments', started, created)
+
+        started = time.perf_counter()
+        after = last_id(Follow)
+        bulk_insert(
+            Follow, fake_follows(rnd, sizes['follows'], user_ids, authors),
+            batch_size, ignore_conflicts=True)
+        created = Follow.objects.filter(id__gt=after).count()
+        self.step('follows', started, created)
+
+        started = time.perf_counter()
+        feed_user_ids = ()
+        if not options['no_feeds']:
+            feed_user_ids = list(Follow.objects.filter(
+                user_id__gte=user_ids[0], user_id__lte=user_ids[-1],
+            ).values_list('user_id', flat=True).distinct())
+        finish_bulk_load(feed_user_ids=feed_user_ids)
+        self.step('feeds', started, FeedEntry.objects.filter(
+            user_id__gte=user_ids[0], user_id__lte=user_ids[-1]).count())
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - total:.1f} с. '
+            f'Пароль пользователей: {SEED_PASSWORD}'))
+
+    def make_images(self, prefix, number, rnd):
+        names = []
+        for index in range(number):
+            image = Image.new('RGB', IMAGE_SIZE, tuple(
+                rnd.randrange(256) for _ in range(3)))
+            content = io.BytesIO()
+            image.save(content, 'JPEG', quality=80)
+            names.append(default_storage.save(
+                f'posts/{prefix}_{index}.jpg',
+                ContentFile(content.getvalue()),
+            ))
+        return names
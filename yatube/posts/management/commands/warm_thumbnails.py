@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import VARIANTS_KEY, generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Нарезает миниатюры всех размеров из шаблонов для картинок '
+        'постов, у которых их ещё нет. Без фоновых задач '
+        '(POSTS_BACKGROUND_TASKS=0) новые картинки режет только она, '
+        'поэтому её стоит запускать по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Обработать и картинки с уже готовыми вариантами.',
+        )
+
+    def pending(self, names, chunk_size):
+        """Имена картинок без готовых вариантов, кусками по chunk_size."""
+        chunk = []
+        for name in names.iterator(chunk_size=chunk_size):
+            chunk.append(name)
+            if len(chunk) == chunk_size:
+                yield from self.without_variants(chunk)
+                chunk = []
+        yield from self.without_variants(chunk)
+
+    def without_variants(self, names):
+        ready = cache.get_many(
+            [VARIANTS_KEY.format(name=name) for name in names])
+        return [
+            name for name in names
+            if VARIANTS_KEY.format(name=name) not in ready
+        ]
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True).distinct()
+        if options['all']:
+            names = names.iterator(chunk_size=options['chunk_size'])
+        else:
+            names = self.pending(names, options['chunk_size'])
+        started = time.perf_counter()
+        done = failed = 0
+        for name in names:
+            try:
+                ready = generate(name)
+            except Exception as error:
+                ready = None
+                self.stderr.write(f'{name}: {error}')
+            if ready is None:
+                failed += 1
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {done}, с ошибками: {failed}, '
+            f'за {time.perf_counter() - started:.1f} с'))
@@ -52,9 +52,24 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        # По возрастанию: обратный проход даёт порядок (pub_date, id) DESC,
+        # id входит в индекс SQLite неявно (rowid).
+        indexes = [
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date_idx',
+            ),
+        ]
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
         default_related_name = 'posts'
@@ -86,6 +101,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx',
+            ),
+        ]
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
         default_related_name = 'comments'
@@ -114,8 +134,73 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_user_author',
             ),
         ]
+        # Поиск по (user) обслуживает уникальный индекс (user, author).
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx',
+            ),
+        ]
         verbose_name_plural = 'Подписки'
         verbose_name = 'Подписка'
 
     def __str__(self):
         return f'{self.user} подписался на публикации {self.author}'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0)
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Счётчики авторов'
+        verbose_name = 'Счётчики автора'
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_user_post',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='feed_user_pub_date_idx',
+            ),
+        ]
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты'
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
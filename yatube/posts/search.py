@@ -0,0 +1,94 @@
+"""
+Полнотекстовый поиск по Post.text через виртуальную таблицу SQLite FTS5.
+
+Индекс — таблица с внешним содержимым (content=posts_post), её синхронизируют
+триггеры на вставку, удаление и изменение текста, поэтому bulk_create
+и правки через update() тоже попадают в индекс. На других СУБД поиск
+деградирует до icontains.
+"""
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+INSTALL_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "text, content='{table}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} "
+    "BEGIN INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} "
+    "BEGIN INSERT INTO {fts} ({fts}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF text "
+    "ON {table} BEGIN "
+    "INSERT INTO {fts} ({fts}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text); END",
+)
+REBUILD_SQL = "INSERT INTO {fts} ({fts}) VALUES ('rebuild')"
+MATCH_SQL = 'SELECT rowid FROM {fts} WHERE {fts} MATCH %s'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_statements(statements, table=Post._meta.db_table, fts=FTS_TABLE):
+    return [sql.format(table=table, fts=fts) for sql in statements]
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """
+    Превращает пользовательский ввод в выражение MATCH: каждое слово —
+    префиксный поиск в кавычках, слова объединяются через AND. Синтаксис
+    FTS5 из ввода не пропускается, так что ошибок разбора не бывает.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def install_index(rebuild=True):
+    """Создаёт таблицу и триггеры, если их нет, и переиндексирует посты."""
+    with connection.cursor() as cursor:
+        for sql in fts_statements(INSTALL_SQL):
+            cursor.execute(sql)
+        if rebuild:
+            cursor.execute(fts_statements([REBUILD_SQL])[0])
+
+
+def filter_posts(queryset, query):
+    """Сужает queryset до постов, подходящих под запрос, без ранжирования."""
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.extra(
+        where=[f'{Post._meta.db_table}.id IN ({MATCH_SQL})'.format(
+            fts=FTS_TABLE)],
+        params=[match],
+    )
+
+
+def search_posts(queryset, query):
+    """Посты, отсортированные по релевантности bm25 (лучшие первыми)."""
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+        select={'rank': f'bm25({FTS_TABLE})'},
+        order_by=['rank', '-pub_date'],
+    )
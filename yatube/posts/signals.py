@@ -0,0 +1,191 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import feed, thumbnails
+from .cache import bump_version
+from .counters import increment
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .tasks import enqueue
+
+User = get_user_model()
+
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def author_username(instance):
+    if Post.author.is_cached(instance):
+        return instance.author.username
+    return User.objects.filter(
+        id=instance.author_id).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Group)
+def invalidate_post_counts(sender, **kwargs):
+    """Счётчики списков постов зависят от постов, подписок и групп."""
+    bump_version('posts')
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded_group(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    instance._loaded_image = str(instance.__dict__.get('image') or '')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    """Сбрасывает кэш главной, страницы автора и групп (старой и новой)."""
+    if raw:
+        return
+    bump_version('page:index')
+    group_ids = {instance.group_id, instance._loaded_group_id} - {None}
+    if group_ids:
+        for slug in Group.objects.filter(
+                id__in=group_ids).values_list('slug', flat=True):
+            bump_version(f'page:group:{slug}')
+    username = author_username(instance)
+    if username:
+        bump_version(f'page:profile:{username}')
+    bump_version(f'page:post:{instance.id}')
+    bump_version(f'page:author:{instance.author_id}')
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_version('page:index')
+    bump_version(f'page:group:{instance.slug}')
+    bump_version('page:groups')
+
+
+@receiver(post_init, sender=User)
+def remember_loaded_names(sender, instance, **kwargs):
+    instance._loaded_names = tuple(
+        instance.__dict__.get(field) for field in AUTHOR_NAME_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, raw=False,
+                            update_fields=None, **kwargs):
+    """
+    Имя автора выводится в карточках его постов на главной, в группах,
+    на его странице и на страницах постов. Сохранения без смены имени
+    (например, last_login при входе) кэш не трогают.
+    """
+    names = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    loaded, instance._loaded_names = instance._loaded_names, names
+    if raw or created or names == loaded or (
+            update_fields is not None
+            and not set(update_fields) & set(AUTHOR_NAME_FIELDS)):
+        return
+    bump_version('page:index')
+    for username in {names[0], loaded[0]} - {None}:
+        bump_version(f'page:profile:{username}')
+    bump_version(f'page:author:{instance.id}')
+    for slug in Group.objects.filter(
+            posts__author=instance).values_list('slug', flat=True).distinct():
+        bump_version(f'page:group:{slug}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(f'page:post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_page(sender, instance, raw=False, **kwargs):
+    """
+    Кнопка подписки и счётчик подписчиков на странице автора, счётчик
+    подписок на странице подписчика зависят от Follow.
+    """
+    if raw:
+        return
+    for username in User.objects.filter(
+            id__in=(instance.author_id, instance.user_id)).values_list(
+            'username', flat=True):
+        bump_version(f'page:profile:{username}')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        enqueue(feed.fan_out_post, instance.id)
+
+
+@receiver(post_save, sender=Post)
+def generate_thumbnails(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Миниатюры новой картинки режутся в фоне сразу после сохранения."""
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    name = instance.image.name
+    if name and name != instance._loaded_image:
+        thumbnails.schedule(name)
+    instance._loaded_image = name or ''
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed_on_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed_on_unfollow(sender, instance, **kwargs):
+    feed.remove_from_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_author_posts(sender, instance, created=None, raw=False, **kwargs):
+    if raw or created is False:
+        return
+    increment(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'posts_count', 1 if created else -1,
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def count_post_comments(sender, instance, created=None, raw=False,
+                        **kwargs):
+    if raw or created is False:
+        return
+    increment(
+        Post.objects.filter(id=instance.post_id),
+        'comments_count', 1 if created else -1,
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follows(sender, instance, created=None, raw=False, **kwargs):
+    if raw or created is False:
+        return
+    delta = 1 if created else -1
+    increment(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'followers_count', delta,
+    )
+    increment(
+        AuthorStats.objects.filter(user_id=instance.user_id),
+        'following_count', delta,
+    )
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_BACKGROUND_WORKERS,
+            thread_name_prefix='posts-tasks',
+        )
+    return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args):
+    """
+    Запускает func(*args) в фоне после коммита текущей транзакции.
+    Без POSTS_BACKGROUND_TASKS задача выполняется сразу, в том же потоке.
+    """
+    if not settings.POSTS_BACKGROUND_TASKS:
+        func(*args)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, func, args))
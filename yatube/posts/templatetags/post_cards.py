@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, template_name):
+    """Карточки постов страницы: {% post_cards page_obj '...' as cards %}."""
+    return [mark_safe(html) for html in render_cards(posts, template_name)]
@@ -0,0 +1,33 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(image, sizes=thumbnails.CARD_SIZES):
+    """
+    <picture> с srcset по форматам и ширинам; пока варианты не нарезаны —
+    исходная картинка в пропорциях карточки.
+    """
+    ready = thumbnails.get_variants(image)
+    if not ready:
+        return {'image': image, 'size': thumbnails.CARD_SIZE}
+    sources = []
+    for fmt in thumbnails.FORMATS:
+        variants = [variant for variant in ready if variant['format'] == fmt]
+        sources.append({
+            'type': thumbnails.MIME_TYPES[fmt],
+            'srcset': ', '.join(
+                f'{variant["url"]} {variant["width"]}w'
+                for variant in variants
+            ),
+            'fallback': variants[-1],
+        })
+    return {
+        'image': image,
+        'sources': sources[:-1],
+        'img': sources[-1],
+        'sizes': sizes,
+    }
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..management.commands.bench import BENCH_COMMENT, compare
+from ..models import Comment, Follow, Post, User
+
+ROW = {'rps': 100.0, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0}
+
+
+class CompareTests(SimpleTestCase):
+    def test_within_thresholds(self):
+        """Колебания в пределах порогов не считаются регрессией"""
+        row = dict(ROW, rps=85.0, p95_ms=24.0, p99_ms=36.0)
+        self.assertEqual(
+            compare({'index': row}, {'index': ROW}, 0.25, 0.2), [])
+
+    def test_regressions(self):
+        """Рост задержки и падение пропускной способности — регрессии"""
+        row = dict(ROW, rps=70.0, p99_ms=50.0)
+        regressions = compare({'index': row}, {'index': ROW}, 0.25, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('index: p99_ms'))
+
+    def test_new_scenario_is_skipped(self):
+        """Сценарий без базового прогона не сравнивается"""
+        self.assertEqual(compare({'index': ROW}, {}, 0.25, 0.2), [])
+
+
+class BenchCommandTests(TransactionTestCase):
+    """Команда поднимает сервер в потоке, поэтому данные коммитятся."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        for i in range(30):
+            Post.objects.create(text=f'Пост {i}', author=author)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.output = os.path.join(directory, 'bench.json')
+        self.addCleanup(
+            lambda: os.path.exists(self.output) and os.remove(self.output))
+
+    def bench(self, *args):
+        call_command(
+            'bench', '--requests', '4', '--warmup', '1',
+            '--concurrency', '2', *args, stdout=StringIO())
+
+    def test_bench_writes_report(self):
+        """bench прогоняет все сценарии, пишет JSON и убирает комментарии"""
+        self.bench('--output', self.output)
+        with open(self.output) as report:
+            scenarios = json.load(report)['scenarios']
+        self.assertEqual(set(scenarios), {
+            'index', 'index_deep', 'follow_index', 'post_detail',
+            'add_comment',
+        })
+        for name, row in scenarios.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(row['requests'], 4)
+                self.assertEqual(row['errors'], 0)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        self.assertFalse(Comment.objects.filter(text=BENCH_COMMENT).exists())
+
+    def test_bench_fails_on_regression(self):
+        """Прогон медленнее baseline завершается ошибкой"""
+        fast = dict(ROW, rps=1e9, p95_ms=1e-6, p99_ms=1e-6)
+        with open(self.output, 'w') as baseline:
+            json.dump({'scenarios': {'index': fast}}, baseline)
+        with self.assertRaises(CommandError):
+            self.bench('--scenarios', 'index', '--baseline', self.output)
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        cache.clear()
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за созданием и удалением"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Пост 2', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            data={'text': 'Комментарий'},
+        )
+        comment = Comment.objects.get(post=post)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обеих сторон"""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.follower).following_count, 0)
+
+    def test_edit_keeps_comment_counter(self):
+        """Редактирование поста не затирает счётчик комментариев"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        Comment.objects.create(post=post, author=self.follower, text='К')
+        author_client.post(
+            reverse('posts:edit', args=(post.id,)), data={'text': 'Новый'})
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.comments_count), ('Новый', 1))
+
+    def test_profile_shows_counters(self):
+        """Страница автора берёт числа из счётчиков"""
+        Post.objects.create(text='Пост', author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(
+            posts_count=7, followers_count=3)
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=(self.author.username,)))
+        self.assertContains(response, 'Всего постов: 7')
+        self.assertContains(response, 'Подписчиков: 3')
+
+    def test_reconcile_command(self):
+        """reconcile_counters исправляет расхождения"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.bulk_create([
+            Post(text='Без сигнала', author=self.author)])
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.follower, text='Без сигнала')])
+        AuthorStats.objects.filter(user=self.follower).delete()
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertIn('исправлено постов: 1', out.getvalue())
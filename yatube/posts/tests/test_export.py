@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..export import EXPORT_FIELDS, export_rows
+from ..models import Group, Post, User
+from .test_query_plans import is_bad_step
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.admin = User.objects.create_user(
+            username='admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        now = timezone.now()
+        for i in range(5):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None)
+        for i, post in enumerate(Post.objects.order_by('id')):
+            Post.objects.filter(id=post.id).update(
+                pub_date=now - timedelta(days=i))
+        Post.objects.create(text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_author_jsonl(self):
+        """Выгрузка автора — JSONL его постов в порядке публикации"""
+        response = self.client.get(
+            reverse('posts:export_author', args=('author',)))
+        self.assertTrue(response.streaming)
+        self.assertIn('posts-author.jsonl', response['Content-Disposition'])
+        rows = [json.loads(line) for line in self.content(response).split(
+            '\n') if line]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), set(EXPORT_FIELDS))
+        self.assertEqual(
+            [row['text'] for row in rows],
+            [f'Пост {i}' for i in reversed(range(5))])
+
+    def test_group_csv(self):
+        """Выгрузка группы в CSV содержит только посты группы"""
+        response = self.client.get(
+            reverse('posts:export_group', args=('group',)),
+            {'format': 'csv'},
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(self.content(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row['group'] == 'group' for row in rows))
+
+    def test_site_export_is_staff_only(self):
+        """Выгрузка всего сайта доступна только администраторам"""
+        url = reverse('posts:export_site')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(len(self.content(response).splitlines()), 6)
+
+    def test_unknown_format(self):
+        """Неизвестный формат выгрузки — 404"""
+        response = self.client.get(
+            reverse('posts:export_author', args=('author',)),
+            {'format': 'xml'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_posts_are_read_lazily(self):
+        """Посты читаются при отдаче ответа, а не при его создании"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:export_author', args=('author',)))
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries))
+        self.assertTrue(next(iter(response.streaming_content)))
+
+    def test_export_uses_indexes(self):
+        """
+        Выборки выгрузки идут в порядке индекса без сортировки; выгрузка
+        автора и группы не проходит по всей таблице постов.
+        """
+        tables = set(connection.introspection.table_names())
+        for queryset, whole_table in (
+            (Post.objects.all(), True),
+            (Post.objects.filter(author=self.author), False),
+            (Post.objects.filter(group=self.group), False),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                list(export_rows(queryset))
+            sql = queries[-1]['sql']
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                steps = [row[-1] for row in cursor.fetchall()]
+            bad = [
+                step for step in steps if is_bad_step(step, tables)
+                and not (whole_table and step.startswith('SCAN posts_post'))
+            ]
+            with self.subTest(sql=sql):
+                self.assertFalse(bad, steps)
+
+    def test_round_trip_through_import(self):
+        """Выгрузку можно загрузить обратно командой import_content"""
+        response = self.client.get(
+            reverse('posts:export_author', args=('author',)))
+        exported = self.content(response)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'posts.jsonl')
+        with open(path, 'w') as target:
+            target.write(exported)
+        before = list(Post.objects.filter(author=self.author).order_by(
+            'id').values_list('id', 'text', 'group', 'pub_date'))
+        Post.objects.filter(author=self.author).delete()
+        call_command('import_content', 'posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(author=self.author).order_by(
+                'id').values_list('id', 'text', 'group', 'pub_date')),
+            before)
@@ -0,0 +1,152 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feed
+from ..feed import fan_out_post, rebuild_feed, rebuild_feeds
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.author_2 = User.objects.create_user(username='author_2')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.FOLLOW_INDEX = reverse('posts:follow_index')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        cache.clear()
+
+    def feed_posts(self):
+        return list(Post.objects.filter(feed_entries__user=self.follower))
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает"""
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(self.feed_posts(), [post])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertEqual(self.feed_posts(), [])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.author_2)
+        response = self.authorized_client.get(self.FOLLOW_INDEX)
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    @override_settings(POSTS_FEED_SIZE=3)
+    def test_feed_is_capped(self):
+        """В ленте хранится не больше POSTS_FEED_SIZE записей"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(5)
+        ]
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.follower).count(), 3)
+        self.assertEqual(self.feed_posts(), posts[:1:-1])
+
+    @override_settings(POSTS_FEED_SIZE=3)
+    def test_fan_out_trims_in_bulk(self):
+        """
+        Рассылка по многим подписчикам обрезает ленты за фиксированное
+        число запросов, а не по два на подписчика.
+        """
+        old = [
+            Post.objects.create(text=f'Пост {i}', author=self.author_2)
+            for i in range(3)
+        ]
+        User.objects.bulk_create(
+            User(username=f'reader{i}') for i in range(30))
+        readers = list(User.objects.filter(username__startswith='reader'))
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user=reader, post=post, pub_date=post.pub_date)
+            for reader in readers for post in old)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author) for reader in readers)
+        with self.assertNumQueries(5):
+            fan_out_post(post.id)
+        for reader in readers:
+            self.assertEqual(
+                list(FeedEntry.objects.filter(user=reader).order_by(
+                    '-pub_date', '-id').values_list('post', flat=True)),
+                [post.id, old[2].id, old[1].id])
+
+    @override_settings(POSTS_FEED_SIZE=3)
+    def test_unfollow_refills_full_feed(self):
+        """После отписки заполненная лента добирает старые посты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        old = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(2)
+        ]
+        Follow.objects.create(user=self.follower, author=self.author_2)
+        Post.objects.create(text='Новый пост', author=self.author_2)
+        Post.objects.create(text='Новый пост 2', author=self.author_2)
+        Follow.objects.get(user=self.follower, author=self.author_2).delete()
+        self.assertEqual(self.feed_posts(), old[::-1])
+
+    @override_settings(POSTS_FEED_SIZE=3)
+    def test_rebuild_feeds_merges_authors(self):
+        """rebuild_feeds сливает посты авторов так же, как rebuild_feed"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author_2)
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            Post.objects.create(text=f'Пост {i}', author=self.author_2)
+        rebuild_feed(self.follower.id)
+        expected = self.feed_posts()
+        FeedEntry.objects.all().delete()
+        self.assertEqual(rebuild_feeds([self.follower.id]), 1)
+        self.assertEqual(self.feed_posts(), expected)
+        self.assertEqual(len(expected), 3)
+
+    def test_rebuild_feeds_bounds_author_cache(self):
+        """
+        Кэш постов авторов ограничен: вытесненный автор перечитывается,
+        ленты от этого не меняются
+        """
+        reader = User.objects.create_user(username='reader')
+        for user in (self.follower, reader):
+            Follow.objects.create(user=user, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        users = [self.follower.id, reader.id]
+
+        def queries(cache_rows):
+            FeedEntry.objects.all().delete()
+            with mock.patch.object(feed, 'BATCH_SIZE', 1), \
+                    mock.patch.object(feed, 'LATEST_CACHE_ROWS', cache_rows), \
+                    CaptureQueriesContext(connection) as context:
+                rebuild_feeds(users)
+            self.assertEqual(
+                list(FeedEntry.objects.order_by('user_id').values_list(
+                    'user_id', 'post_id')),
+                [(user_id, post.id) for user_id in sorted(users)])
+            return len(context)
+
+        self.assertEqual(queries(0) - queries(1), 1)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_feeds восстанавливает ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        FeedEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_feeds', stdout=out)
+        self.assertEqual(self.feed_posts(), [post])
+        self.assertIn('1', out.getvalue())
@@ -0,0 +1,94 @@
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feeds import FEED_ITEMS
+from ..models import Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы')
+        for i in range(FEED_ITEMS + 5):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None)
+        Post.objects.create(text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def rss_items(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return ElementTree.fromstring(response.content).findall(
+            'channel/item')
+
+    def test_rss_feeds(self):
+        """Ленты главной, группы и автора содержат свои посты"""
+        index = self.rss_items(reverse('posts:index_rss'))
+        self.assertEqual(len(index), FEED_ITEMS)
+        self.assertEqual(index[0].findtext('title'), 'Чужой пост')
+        group = self.rss_items(reverse('posts:group_rss', args=('group',)))
+        self.assertTrue(all(
+            item.findtext('category') == 'Группа' for item in group))
+        author = self.rss_items(
+            reverse('posts:profile_rss', args=('other',)))
+        self.assertEqual(len(author), 1)
+        self.assertTrue(author[0].findtext('link').endswith(
+            reverse('posts:post_detail', args=(
+                Post.objects.get(author=self.other).id,))))
+
+    def test_atom_feed(self):
+        """Atom-лента автора подписывает записи его именем"""
+        response = self.client.get(
+            reverse('posts:profile_atom', args=('author',)))
+        root = ElementTree.fromstring(response.content)
+        entries = root.findall(f'{ATOM}entry')
+        self.assertEqual(len(entries), FEED_ITEMS)
+        self.assertEqual(
+            entries[0].findtext(f'{ATOM}author/{ATOM}name'), 'Лев Толстой')
+
+    def test_unknown_group(self):
+        """Лента несуществующей группы — 404"""
+        response = self.client.get(
+            reverse('posts:group_rss', args=('missing',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_and_conditional(self):
+        """
+        Повторная лента берётся из кэша, опрос с ETag получает 304
+        без запросов к базе, новый пост меняет ETag
+        """
+        url = reverse('posts:group_rss', args=('group',))
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(
+            text='Новый пост', author=self.other, group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый пост', response.content.decode())
+
+    def test_etag_is_shared(self):
+        """ETag ленты одинаков для гостя и пользователя"""
+        url = reverse('posts:index_rss')
+        etag = self.client.get(url)['ETag']
+        authorized = Client()
+        authorized.force_login(self.other)
+        self.assertEqual(authorized.get(url)['ETag'], etag)
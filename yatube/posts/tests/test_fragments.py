@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import fragments
+from ..models import Group, Post, User
+from ..views import post_cards
+
+CARD = 'includes/post_card.html'
+
+
+class PostCardsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def posts(self):
+        return list(post_cards(Post.objects.all()))
+
+    def test_warm_page_is_one_round_trip(self):
+        """Второй показ страницы читает карточки одним get_many"""
+        fragments.render_cards(self.posts(), CARD)
+        with mock.patch.object(
+                fragments, 'get_template') as get_template, \
+                mock.patch.object(
+                    cache, 'get_many', wraps=cache.get_many) as get_many:
+            cards = fragments.render_cards(self.posts(), CARD)
+        get_template.assert_not_called()
+        get_many.assert_called_once()
+        self.assertEqual(len(cards), 3)
+        self.assertIn('Пост 2', cards[0])
+
+    def test_edit_changes_card(self):
+        """Правка поста, группы или автора даёт новую карточку"""
+        fragments.render_cards(self.posts(), CARD)
+        post = Post.objects.latest('pub_date')
+        post.text = 'Исправленный пост'
+        post.save()
+        Group.objects.filter(id=self.group.id).update(title='Новая группа')
+        User.objects.filter(id=self.author.id).update(first_name='Фёдор')
+        card = fragments.render_cards(self.posts(), CARD)[0]
+        self.assertIn('Исправленный пост', card)
+        self.assertIn('Новая группа', card)
+        self.assertIn('Фёдор', card)
+
+    def test_card_depends_on_template(self):
+        """Карточки разных списков кэшируются отдельно"""
+        post = self.posts()[0]
+        self.assertNotEqual(
+            fragments.card_key(post, CARD),
+            fragments.card_key(post, 'includes/group_card.html'))
+
+    def test_card_depends_on_template_source(self):
+        """Новая разметка подключённого шаблона даёт новую карточку"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(fragments.template_digest.cache_clear)
+        os.makedirs(os.path.join(directory, 'cards'))
+        with open(os.path.join(directory, 'cards', 'card.html'), 'w') as f:
+            f.write("{% include 'cards/text.html' %}")
+
+        def card_key(markup):
+            with open(os.path.join(directory, 'cards', 'text.html'),
+                      'w') as target:
+                target.write(markup)
+            # Как после выкладки: новый процесс читает шаблоны заново.
+            fragments.template_digest.cache_clear()
+            for loader in engines['django'].engine.template_loaders:
+                loader.reset()
+            return fragments.card_key(post, 'cards/card.html')
+
+        templates = [{**settings.TEMPLATES[0], 'DIRS': [directory]}]
+        post = self.posts()[0]
+        with override_settings(TEMPLATES=templates):
+            old = card_key('<p>{{ post.text }}</p>')
+            self.assertEqual(card_key('<p>{{ post.text }}</p>'), old)
+            self.assertNotEqual(card_key('<b>{{ post.text }}</b>'), old)
+
+    def test_pending_thumbnails_are_not_cached(self):
+        """Карточку с ненарезанной картинкой не кэшируем"""
+        Post.objects.filter(text='Пост 2').update(image='posts/pending.gif')
+        with mock.patch('posts.thumbnails.schedule'):
+            fragments.render_cards(self.posts(), CARD)
+        keys = [fragments.card_key(post, CARD) for post in self.posts()]
+        self.assertEqual(len(cache.get_many(keys)), 2)
+        self.assertNotIn(keys[0], cache.get_many(keys))
+
+    def test_pages_show_cached_cards(self):
+        """Списки постов выводят карточки в порядке страницы"""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        ):
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertLess(
+                    content.index('Пост 2'), content.index('Пост 0'))
+                self.assertEqual(content.count('подробная информация'), 3)
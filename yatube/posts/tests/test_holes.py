@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.holes import MARKER_RE, marker
+
+from ..models import Follow, Post, User
+
+
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_logged_in_user_hits_shared_cache(self):
+        """Страница, закэшированная гостем, отдаётся и пользователю"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        # Только сессия и пользователь для шапки.
+        with self.assertNumQueries(2):
+            response = self.reader_client.get(url)
+        self.assertContains(response, 'Пользователь:')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotIn(b'<!--hole:', response.content)
+
+    def test_no_user_data_leaks(self):
+        """Из кэша каждый видит свою шапку и свою кнопку подписки"""
+        url = reverse('posts:profile', args=(self.author.username,))
+        first = self.reader_client.get(url).content.decode()
+        self.assertIn('Отписаться', first)
+        self.assertIn('>reader</a>', first)
+        cached = self.author_client.get(url).content.decode()
+        self.assertIn('>author</a>', cached)
+        self.assertNotIn('reader', cached)
+        self.assertNotIn('Отписаться', cached)
+        guest = self.guest_client.get(url).content.decode()
+        self.assertIn('Войти', guest)
+        self.assertNotIn('Пользователь:', guest)
+
+    def test_post_detail_actions(self):
+        """Форма комментария с CSRF и ссылка правки — только своим"""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        edit = reverse('posts:edit', args=(self.post.id,))
+        self.assertNotContains(self.guest_client.get(url), 'csrfmiddleware')
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, edit)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertContains(self.author_client.get(url), edit)
+
+    def test_marker_cannot_be_forged(self):
+        """Метка в тексте поста экранируется и не заполняется"""
+        Post.objects.create(
+            text=marker('header', {}), author=self.author)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.content.count(b'navbar-brand'), 1)
+        self.assertFalse(MARKER_RE.search(response.content))
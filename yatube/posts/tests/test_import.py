@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..importer import Importer, Lookup
+from ..models import AuthorStats, FeedEntry, Follow, Group, Post, User
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write_jsonl(self, name, records, mode='w'):
+        path = os.path.join(self.directory, name)
+        with open(path, mode) as target:
+            for record in records:
+                target.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def import_content(self, *args):
+        err = StringIO()
+        call_command('import_content', *args, stdout=StringIO(), stderr=err)
+        return err.getvalue()
+
+    def test_import_posts_preserves_dates(self):
+        """Импорт постов сохраняет дату, группу и id, чинит счётчики"""
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 500, 'author': 'author', 'text': 'Старый пост',
+             'group': 'group', 'pub_date': '2015-03-01T10:00:00'},
+            {'author': 'author', 'text': 'Без даты'},
+            {'author': 'ghost', 'text': 'Неизвестный автор'},
+        ])
+        err = self.import_content('posts', path)
+        post = Post.objects.get(id=500)
+        self.assertEqual(post.pub_date, timezone.make_aware(
+            datetime(2015, 3, 1, 10)))
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertIn("'ghost'", err)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+
+    def test_import_comments_from_csv(self):
+        """Комментарии из CSV привязываются к постам, счётчик пересчитан"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = os.path.join(self.directory, 'comments.csv')
+        with open(path, 'w') as target:
+            target.write('post,author,text,created\n')
+            target.write(f'{post.id},reader,Первый,2016-01-01T00:00:00\n')
+            target.write(f'{post.id},reader,Второй,\n')
+            target.write('999999,reader,К несуществующему посту,\n')
+        self.import_content('comments', path, '--batch-size', '2')
+        self.assertEqual(post.comments.count(), 2)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            post.comments.get(text='Первый').created.year, 2016)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Повторный запуск продолжает с контрольной точки"""
+        records = [
+            {'author': 'author', 'text': f'Пост {i}'} for i in range(3)]
+        path = self.write_jsonl('posts.jsonl', records)
+        self.import_content('posts', path, '--batch-size', '2')
+        self.write_jsonl('posts.jsonl', [
+            {'author': 'author', 'text': 'Дописанный пост'}], mode='a')
+        self.import_content('posts', path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 4)
+        with open(f'{path}.checkpoint') as checkpoint:
+            self.assertEqual(json.load(checkpoint)['done'], 4)
+        self.import_content('posts', path, '--restart')
+        self.assertEqual(Post.objects.count(), 8)
+
+    def test_resume_after_crash_does_not_duplicate(self):
+        """
+        Пачка, записанная упавшим запуском до контрольной точки,
+        повторяется без дублей, а ленты и счётчики доводятся до конца
+        """
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'author', 'text': 'Пост 1'},
+            {'author': 'author', 'text': 'Пост 2'},
+            {'id': 700, 'author': 'author', 'text': 'Пост с id'},
+            {'author': 'author', 'text': 'Пост 3'},
+        ])
+        fix_up = Importer.fix_up
+        calls = []
+
+        def crash_on_second_batch(importer, objects):
+            calls.append(objects)
+            if len(calls) == 2:
+                raise OSError('процесс убит')
+            return fix_up(importer, objects)
+
+        with mock.patch.object(
+                Importer, 'fix_up', crash_on_second_batch), \
+                self.assertRaises(OSError):
+            self.import_content('posts', path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 4)
+        self.import_content('posts', path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 4)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 4)
+        with open(f'{path}.checkpoint') as checkpoint:
+            state = json.load(checkpoint)
+        self.assertEqual((state['done'], state['written']), (4, 4))
+
+    def test_lookup_is_bounded(self):
+        """Кэш поиска авторов не растёт больше maxsize"""
+        lookup = Lookup(User, 'username', maxsize=1)
+        lookup.prefetch(['author', 'reader', 'ghost'])
+        self.assertEqual(len(lookup.cache), 1)
+        self.assertEqual(lookup.get('author'), self.author.id)
+        self.assertIsNone(lookup.get('ghost'))
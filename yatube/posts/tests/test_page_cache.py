@@ -0,0 +1,186 @@
+import hashlib
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse, HttpResponseNotFound
+from django.test import RequestFactory, SimpleTestCase
+from django.views.decorators.http import condition
+
+from .. import cache as page_cache
+from ..cache import (
+    bump_version, cache_page_versioned, page_cache_metrics, versioned_etag,
+)
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+        self.content = 'v1'
+        self.delay = 0
+
+        @cache_page_versioned('test:page')
+        def view(request):
+            self.renders += 1
+            time.sleep(self.delay)
+            return HttpResponse(self.content)
+        self.view = view
+
+    def get(self):
+        return self.view(self.factory.get('/page/')).content.decode()
+
+    def lock_key(self):
+        key = page_cache.PAGE_KEY.format(
+            view='view', url=hashlib.md5(
+                b'http://testserver/page/').hexdigest())
+        return page_cache.LOCK_KEY.format(key=key)
+
+    def test_cold_stampede_renders_once(self):
+        """Одновременные промахи ждут один рендер, а не рисуют все"""
+        self.delay = 0.2
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.get()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(results, ['v1'] * 8)
+        metrics = page_cache_metrics()
+        self.assertEqual(metrics['lock_waits'], 7)
+        self.assertEqual(metrics['lock_timeouts'], 0)
+
+    def test_stale_served_while_revalidating(self):
+        """Пока страницу перерисовывают, остальные получают прежнюю"""
+        self.get()
+        self.content = 'v2'
+        bump_version('test:page')
+        # Страницу уже перерисовывает другой запрос.
+        cache.add(self.lock_key(), 1)
+        self.assertEqual(self.get(), 'v1')
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(page_cache_metrics()['stale_serves'], 1)
+        cache.delete(self.lock_key())
+        self.assertEqual(self.get(), 'v2')
+
+    def test_stale_page_has_own_etag(self):
+        """
+        Устаревшая страница не получает ETag новой версии: перепроверка
+        с её ETag после рендера новой версии даёт 200, а не 304.
+        """
+        @condition(etag_func=versioned_etag('test:page'))
+        @cache_page_versioned('test:page')
+        def view(request):
+            return HttpResponse(self.content)
+
+        def get(**headers):
+            request = self.factory.get('/page/', **headers)
+            request.user = AnonymousUser()
+            return view(request)
+
+        fresh_etag = get()['ETag']
+        self.content = 'v2'
+        bump_version('test:page')
+        cache.add(self.lock_key(), 1)
+        stale = get()
+        self.assertEqual(stale.content, b'v1')
+        self.assertNotEqual(stale['ETag'], fresh_etag)
+        self.assertEqual(stale['Cache-Control'], 'no-cache')
+        self.assertEqual(
+            get(HTTP_IF_NONE_MATCH=stale['ETag']).content, b'v1')
+        cache.delete(self.lock_key())
+        response = get(HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'v2')
+        self.assertNotIn(response['ETag'], (fresh_etag, stale['ETag']))
+        self.assertEqual(
+            get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_version_bump_renders_without_waiting(self):
+        """Без конкурентов новая версия видна сразу"""
+        self.get()
+        self.content = 'v2'
+        bump_version('test:page')
+        self.assertEqual(self.get(), 'v2')
+        self.assertEqual(self.get(), 'v2')
+        self.assertEqual(self.renders, 2)
+
+    def test_probabilistic_early_refresh(self):
+        """Чем ближе срок и дольше рендер, тем вероятнее ранний рендер"""
+        entry = {'delta': 1.0, 'expires': 100.0}
+        for now, draw, expected in (
+            (90, 0, False),
+            (90, 0.5, False),
+            (90, 1 - 1e-9, True),
+            (99.5, 0.5, True),
+            (100, 0, True),
+        ):
+            with self.subTest(now=now, draw=draw), mock.patch.object(
+                    page_cache.random, 'random', return_value=draw):
+                self.assertEqual(
+                    page_cache.refresh_early(entry, now), expected)
+
+    def test_early_refresh_renders_once(self):
+        """Ранний рендер делает один запрос, остальные берут свежую"""
+        self.get()
+        self.content = 'v2'
+        with mock.patch.object(page_cache, 'refresh_early',
+                               return_value=True):
+            cache.add(self.lock_key(), 1)
+            self.assertEqual(self.get(), 'v1')
+            cache.delete(self.lock_key())
+            self.assertEqual(self.get(), 'v2')
+        self.assertEqual(self.renders, 2)
+        metrics = page_cache_metrics()
+        self.assertEqual(metrics['early_refreshes'], 1)
+        self.assertEqual(metrics['stale_serves'], 0)
+
+    def test_waiters_do_not_wait_for_uncacheable_page(self):
+        """
+        Если рисовавший запрос ничего не сохранил (404), ожидающие
+        рисуют сами сразу, а не ждут LOCK_WAIT
+        """
+        @cache_page_versioned('test:page')
+        def missing(request):
+            time.sleep(0.1)
+            return HttpResponseNotFound()
+        timings = []
+
+        def get():
+            started = time.time()
+            missing(self.factory.get('/missing/'))
+            timings.append(time.time() - started)
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(max(timings), page_cache.LOCK_WAIT / 2)
+        self.assertEqual(page_cache_metrics()['lock_timeouts'], 0)
+
+    def test_errors_are_not_cached(self):
+        """Ответ не 200 не кэшируется и не держит блокировку"""
+        @cache_page_versioned('test:page')
+        def missing(request):
+            self.renders += 1
+            return HttpResponseNotFound()
+        for _ in range(2):
+            missing(self.factory.get('/missing/'))
+        self.assertEqual(self.renders, 2)
+
+    def test_stats_command(self):
+        """page_cache_stats выводит и обнуляет счётчики"""
+        self.get()
+        out = StringIO()
+        call_command('page_cache_stats', '--reset', stdout=out)
+        self.assertIn('renders          1', out.getvalue())
+        self.assertEqual(page_cache_metrics()['renders'], 0)
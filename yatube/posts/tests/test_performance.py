@@ -0,0 +1,203 @@
+import json
+import os
+import random
+import sys
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feed import rebuild_feed
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import CURSOR_NEXT, encode_cursor
+from ..views import COMMENT_KEY_FIELDS
+
+# Сколько раз рендерится каждая страница для расчёта p95.
+RENDERS_PER_VIEW = 20
+# Бюджет времени умножается на POSTS_PERF_BUDGET_SCALE, чтобы на
+# медленных машинах CI не править тесты.
+BUDGET_SCALE = float(os.getenv('POSTS_PERF_BUDGET_SCALE', '1'))
+# Путь для JSON-отчёта, по которому сравниваются релизы.
+REPORT_PATH = os.getenv('POSTS_PERF_REPORT')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[max(int(len(values) * share) - 1, 0)]
+
+
+class ViewBudgetTests(TestCase):
+    """
+    Бюджеты числа запросов и p95 времени рендера горячих страниц
+    на объёмах, похожих на боевые.
+    """
+
+    USERS_NUM = 60
+    GROUPS_NUM = 8
+    POSTS_NUM = 3000
+    COMMENTS_NUM = 3000
+    FOLLOWS_PER_USER = 20
+
+    BUDGETS = {
+        'index': (4, 150),
+        'index_deep': (4, 150),
+        'group_posts': (5, 150),
+        'profile': (6, 150),
+        # Ещё один запрос — автор поста для ETag.
+        'post_detail': (5, 150),
+        'comments_deep': (5, 150),
+        'follow_index': (4, 150),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(0)
+        User.objects.bulk_create(
+            User(username=f'user_{i}') for i in range(cls.USERS_NUM))
+        users = list(User.objects.filter(username__startswith='user_'))
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='Описание')
+            for i in range(cls.GROUPS_NUM)
+        ]
+        authors = users[:cls.USERS_NUM // 3]
+        Post.objects.bulk_create(
+            Post(
+                text=f'Текст поста {i} ' * 20,
+                author=authors[int(rnd.paretovariate(1.2)) % len(authors)],
+                group=rnd.choice(groups + [None]),
+            )
+            for i in range(cls.POSTS_NUM)
+        )
+        cls.hot_post = Post.objects.filter(author=authors[0]).first()
+        recent_posts = list(Post.objects.all()[:50])
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.hot_post if i % 10 else rnd.choice(recent_posts),
+                author=rnd.choice(users),
+                text=f'Комментарий {i}',
+            )
+            for i in range(cls.COMMENTS_NUM)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for user in users
+            for author in rnd.sample(authors, cls.FOLLOWS_PER_USER)
+            if author != user
+        )
+        oldest = Comment.objects.filter(post=cls.hot_post).order_by(
+            'created', 'id')[100]
+        cls.deep_comments_cursor = encode_cursor(
+            oldest, CURSOR_NEXT, COMMENT_KEY_FIELDS)
+        cls.reader = users[-1]
+        rebuild_feed(cls.reader.id)
+        cls.author = authors[0]
+        cls.group = groups[0]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.report = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.report:
+            return
+        lines = [
+            '',
+            f'{"view":<16} {"queries":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"budget":>8}',
+        ]
+        for view, row in cls.report.items():
+            lines.append(
+                f'{view:<16} {row["queries"]:>8} {row["p50_ms"]:>8.1f} '
+                f'{row["p95_ms"]:>8.1f} {row["budget_ms"]:>8.0f}'
+            )
+        sys.stderr.write('\n'.join(lines) + '\n')
+        if REPORT_PATH:
+            with open(REPORT_PATH, 'w') as report:
+                json.dump(cls.report, report, indent=2)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        return {
+            'index': reverse('posts:index'),
+            'index_deep': reverse('posts:index') + '?page=250',
+            'group_posts': reverse(
+                'posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'post_detail': reverse(
+                'posts:post_detail', args=(self.hot_post.id,)),
+            'comments_deep': reverse(
+                'posts:comments', args=(self.hot_post.id,))
+            + f'?cursor={self.deep_comments_cursor}',
+            'follow_index': reverse('posts:follow_index'),
+        }
+
+    def measure(self, url, clear_cache=True, status=200, **headers):
+        timings = []
+        queries_num = 0
+        for _ in range(RENDERS_PER_VIEW):
+            if clear_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self.client.get(url, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.assertEqual(response.status_code, status)
+            queries_num = max(queries_num, len(queries))
+        return queries_num, timings
+
+    def test_view_budgets(self):
+        """Страницы укладываются в бюджет запросов и p95 рендера"""
+        for view, url in self.urls().items():
+            max_queries, budget_ms = self.BUDGETS[view]
+            budget_ms *= BUDGET_SCALE
+            with self.subTest(view=view):
+                queries_num, timings = self.measure(url)
+                p95 = percentile(timings, 0.95)
+                self.report[view] = {
+                    'url': url,
+                    'queries': queries_num,
+                    'p50_ms': percentile(timings, 0.5),
+                    'p95_ms': p95,
+                    'budget_ms': budget_ms,
+                }
+                self.assertLessEqual(
+                    queries_num, max_queries,
+                    f'{view}: {queries_num} запросов, бюджет {max_queries}',
+                )
+                self.assertLessEqual(
+                    p95, budget_ms,
+                    f'{view}: p95 {p95:.1f} мс, бюджет {budget_ms:.0f} мс',
+                )
+
+    def test_conditional_get(self):
+        """Ответ 304 на повторный запрос дешевле полного рендера"""
+        urls = self.urls()
+        for view in ('post_detail', 'profile', 'group_posts'):
+            url = urls[view]
+            with self.subTest(view=view):
+                cache.clear()
+                _, full = self.measure(url)
+                etag = self.client.get(url)['ETag']
+                queries_num, revalidated = self.measure(
+                    url, clear_cache=False, status=304,
+                    HTTP_IF_NONE_MATCH=etag)
+                # Бюджет ответа 304 — медиана полного рендера.
+                self.report[f'{view}_304'] = {
+                    'url': url,
+                    'queries': queries_num,
+                    'p50_ms': percentile(revalidated, 0.5),
+                    'p95_ms': percentile(revalidated, 0.95),
+                    'budget_ms': percentile(full, 0.5),
+                }
+                self.assertLess(
+                    percentile(revalidated, 0.95), percentile(full, 0.5))
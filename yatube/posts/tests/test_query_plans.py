@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+def is_bad_step(step, tables):
+    """
+    Полный проход по таблице (проход по подзапросу — не в счёт)
+    или сортировка выборки во временном B-дереве вместо чтения
+    индекса по порядку.
+    """
+    if step.startswith('USE TEMP B-TREE'):
+        return True
+    words = step.split()
+    return words[0] == 'SCAN' and words[1] in tables
+
+
+class QueryPlanTests(TestCase):
+    """
+    Запросы горячих страниц идут по индексам: EXPLAIN QUERY PLAN каждого
+    запроса страницы не содержит полного прохода и сортировки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author,
+                 group=cls.group if i % 2 else None)
+            for i in range(30)
+        )
+        cls.post = Post.objects.filter(author=cls.author).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+            for i in range(30)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url):
+        tables = set(connection.introspection.table_names())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            plan = self.plan(query['sql'])
+            bad = [step for step in plan if is_bad_step(step, tables)]
+            self.assertEqual(
+                bad, [], f'{url}: {query["sql"]}\n' + '\n'.join(plan))
+
+    def test_hot_views_use_indexes(self):
+        """group_posts, profile, post_detail и follow_index без SCAN"""
+        urls = {
+            'group_posts': reverse(
+                'posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'post_detail': reverse('posts:post_detail', args=(self.post.id,)),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        for view, url in urls.items():
+            with self.subTest(view=view):
+                self.assert_indexed(url)
+
+    def test_cursor_pages_use_indexes(self):
+        """Страницы по курсору тоже читают индекс в обратном порядке"""
+        urls = {
+            'group_posts': (
+                reverse('posts:group_list', args=(self.group.slug,)),
+                'page_obj',
+            ),
+            'profile': (
+                reverse('posts:profile', args=(self.author.username,)),
+                'page_obj',
+            ),
+            'comments': (
+                reverse('posts:comments', args=(self.post.id,)),
+                'comments',
+            ),
+        }
+        for view, (url, page_name) in urls.items():
+            with self.subTest(view=view):
+                page = self.client.get(url).context[page_name]
+                self.assert_indexed(f'{url}?cursor={page.next_cursor}')
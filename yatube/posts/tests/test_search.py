@@ -0,0 +1,114 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import utils
+from ..models import Post, User
+from ..search import FTS_TABLE, filter_posts, match_expression, search_posts
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def found(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_match_expression(self):
+        """Синтаксис FTS5 из ввода экранируется, слова ищутся по префиксу"""
+        self.assertEqual(
+            match_expression('Кот "OR" NEAR(*'), '"Кот"* "OR"* "NEAR"*')
+        self.assertEqual(match_expression(' -*" '), '')
+        self.assertEqual(self.found('"*'), [])
+
+    def test_index_follows_changes(self):
+        """Триггеры синхронизируют индекс при создании, правке и удалении"""
+        post = Post.objects.create(text='Рыжий кот', author=self.author)
+        Post.objects.bulk_create([
+            Post(text='Серый кот', author=self.author),
+        ])
+        self.assertEqual(len(self.found('кот')), 2)
+        post.text = 'Рыжая собака'
+        post.save()
+        self.assertEqual(self.found('рыж'), [post])
+        self.assertEqual(len(self.found('кот')), 1)
+        Post.objects.filter(pk=post.pk).update(text='Лиса')
+        self.assertEqual(self.found('собака'), [])
+        post.delete()
+        self.assertEqual(self.found('лиса'), [])
+
+    def test_ranking(self):
+        """Более релевантные посты идут первыми"""
+        rare = Post.objects.create(
+            text='Про сад и немного про яблоки', author=self.author)
+        often = Post.objects.create(
+            text='Яблоки, яблоки, яблоки', author=self.author)
+        self.assertEqual(self.found('яблоки'), [often, rare])
+        self.assertEqual(self.found('сад яблоки'), [rare])
+
+    def test_search_page(self):
+        """Страница поиска пагинирует выдачу и сохраняет запрос в ссылках"""
+        Post.objects.bulk_create(
+            Post(text=f'Пост про котов {i}', author=self.author)
+            for i in range(13)
+        )
+        Post.objects.create(text='Про собак', author=self.author)
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котов'})
+        self.assertEqual(response.context['query'], 'котов')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D0%BE%D0%B2&amp;'
+                                      'page=2')
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котов', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        response = self.guest_client.get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_search_count_estimated(self):
+        """Оценённое количество найденного выводится как оценка"""
+        Post.objects.bulk_create(
+            Post(text=f'Пост про котов {i}', author=self.author)
+            for i in range(13)
+        )
+        with mock.patch.object(utils, 'ESTIMATE_COUNT_ABOVE', 5):
+            response = self.guest_client.get(
+                reverse('posts:search'), {'q': 'котов'})
+        self.assertContains(response, 'Найдено записей: более 5')
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_admin_search(self):
+        """Поиск в админке идёт через полнотекстовый индекс"""
+        Post.objects.create(text='Уникальное слово', author=self.author)
+        Post.objects.create(text='Другое', author=self.author)
+        self.assertEqual(
+            filter_posts(Post.objects.all(), 'уникал').count(), 1)
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'уникальное'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_rebuild_command(self):
+        """rebuild_search_index восстанавливает потерянный индекс"""
+        post = Post.objects.create(text='Важный пост', author=self.author)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) "
+                           f"VALUES ('delete-all')")
+        self.assertEqual(self.found('важный'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('важный'), [post])
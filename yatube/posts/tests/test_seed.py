@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, Group, Post,
+                      User)
+
+SEED_ARGS = (
+    '--users', '20', '--groups', '3', '--posts', '60',
+    '--comments', '80', '--follows', '40', '--batch-size', '25',
+)
+
+
+class SeedCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_creates_rows(self):
+        """seed создаёт заданное число строк с датами в прошлом"""
+        call_command('seed', *SEED_ARGS, stdout=StringIO())
+        self.assertEqual(
+            User.objects.filter(username__startswith='seed_').count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+        dates = set(Post.objects.values_list('pub_date', flat=True))
+        self.assertGreater(len(dates), 50)
+        first, last = min(dates), max(dates)
+        self.assertGreater((last - first).days, 30)
+
+    def test_seed_reconciles_counters_and_feeds(self):
+        """После seed счётчики сходятся, а ленты подписчиков собраны"""
+        call_command('seed', *SEED_ARGS, stdout=StringIO())
+        for stats in AuthorStats.objects.annotate(
+                actual=Count('user__posts', distinct=True)):
+            self.assertEqual(stats.posts_count, stats.actual)
+        for post in Post.objects.annotate(
+                actual=Count('comments')):
+            self.assertEqual(post.comments_count, post.actual)
+        follow = Follow.objects.filter(
+            author__posts__isnull=False).first()
+        self.assertTrue(FeedEntry.objects.filter(
+            user_id=follow.user_id, post__author_id=follow.author_id,
+        ).exists())
+
+    def test_seed_refuses_existing_prefix(self):
+        """Повторный запуск с тем же префиксом не дублирует пользователей"""
+        call_command('seed', *SEED_ARGS, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed', *SEED_ARGS, stdout=StringIO())
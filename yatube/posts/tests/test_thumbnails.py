@@ -0,0 +1,187 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@contextmanager
+def background_worker():
+    """Фоновые задачи включены, а воркер выполняет их сразу."""
+    with override_settings(POSTS_BACKGROUND_TASKS=True), mock.patch.object(
+            thumbnails, 'enqueue',
+            side_effect=lambda func, *args: func(*args)):
+        yield
+
+
+def uploaded(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    def ready(self, post):
+        post.refresh_from_db()
+        return cache.get(thumbnails.VARIANTS_KEY.format(name=post.image.name))
+
+    def test_generated_after_create_and_edit(self):
+        """Миниатюры нарезаются в фоне после создания и смены картинки"""
+        with background_worker():
+            self.authorized_client.post(
+                reverse('posts:create_post'),
+                data={'text': 'Пост', 'image': uploaded()},
+            )
+        post = Post.objects.get()
+        ready = self.ready(post)
+        self.assertEqual(len(ready), len(thumbnails.variants()))
+        self.assertEqual(
+            [(variant['width'], variant['height']) for variant in ready][:3],
+            [(320, 113), (640, 226), (960, 339)],
+        )
+        with background_worker():
+            self.authorized_client.post(
+                reverse('posts:edit', args=(post.id,)),
+                data={'text': 'Пост', 'image': uploaded('other.gif')},
+            )
+        self.assertIsNotNone(self.ready(post))
+
+    def test_not_regenerated_without_new_image(self):
+        """Правка текста не ставит нарезку в очередь"""
+        post = Post.objects.create(
+            text='Пост', author=self.author, image=uploaded())
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            post.text = 'Новый текст'
+            post.save()
+            Post.objects.create(text='Без картинки', author=self.author)
+        schedule.assert_not_called()
+
+    def test_template_falls_back_to_original(self):
+        """Пока миниатюры нет, выводится исходная картинка без нарезки"""
+        with mock.patch.object(thumbnails, 'schedule'):
+            post = Post.objects.create(
+                text='Пост', author=self.author, image=uploaded())
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        schedule.assert_called_once_with(post.image.name)
+        self.assertIsNone(self.ready(post))
+        with background_worker():
+            self.authorized_client.get(reverse(
+                'posts:post_detail', args=(post.id,)))
+        self.assertIsNotNone(self.ready(post))
+
+    def test_pages_show_srcset_once_generated(self):
+        """Страницы, закэшированные с исходником, получают srcset сразу"""
+        with mock.patch.object(thumbnails, 'schedule'):
+            post = Post.objects.create(
+                text='Пост', author=self.author, image=uploaded())
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(post.id,)),
+        )
+        for url in urls:
+            self.assertNotContains(self.authorized_client.get(url), 'srcset')
+        thumbnails.generate(post.image.name)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.authorized_client.get(url), 'srcset')
+
+    def test_never_generated_inside_request(self):
+        """Без фоновых задач запросы только помечают картинку ожидающей"""
+        with mock.patch.object(thumbnails, 'generate') as generate:
+            self.authorized_client.post(
+                reverse('posts:create_post'),
+                data={'text': 'Пост', 'image': uploaded()},
+            )
+            post = Post.objects.get()
+            cache.clear()
+            response = self.authorized_client.get(reverse(
+                'posts:post_detail', args=(post.id,)))
+        generate.assert_not_called()
+        self.assertContains(response, post.image.url)
+        self.assertTrue(cache.get(
+            thumbnails.PENDING_KEY.format(name=post.image.name)))
+
+    def test_srcset(self):
+        """Готовые варианты выводятся через srcset с размерами и lazy"""
+        with background_worker():
+            post = Post.objects.create(
+                text='Пост', author=self.author, image=uploaded())
+        response = self.authorized_client.get(reverse(
+            'posts:post_detail', args=(post.id,)))
+        ready = self.ready(post)
+        widest = ready[-1]
+        self.assertContains(response, f'src="{widest["url"]}"')
+        self.assertContains(
+            response, f'{ready[0]["url"]} {ready[0]["width"]}w')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'sizes="(max-width: 768px)')
+        self.assertEqual(thumbnails.pick(ready, 500)['width'], 640)
+        self.assertEqual(thumbnails.pick(ready, 2000)['width'], 960)
+
+    def test_schedule_once(self):
+        """Повторный промах не ставит ту же картинку в очередь дважды"""
+        with override_settings(POSTS_BACKGROUND_TASKS=True), \
+                mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            thumbnails.schedule('posts/a.gif')
+            thumbnails.schedule('posts/a.gif')
+        enqueue.assert_called_once_with(thumbnails.generate, 'posts/a.gif')
+
+    def test_warm_command(self):
+        """warm_thumbnails нарезает миниатюры для существующих постов"""
+        with mock.patch.object(thumbnails, 'schedule'):
+            post = Post.objects.create(
+                text='Пост', author=self.author, image=uploaded())
+        self.assertIsNone(self.ready(post))
+        out = StringIO()
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('обработано: 1', out.getvalue())
+        self.assertIsNotNone(self.ready(post))
+        out = StringIO()
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('обработано: 0', out.getvalue())
+        out = StringIO()
+        call_command('warm_thumbnails', '--all', stdout=out)
+        self.assertIn('обработано: 1', out.getvalue())
+        out = StringIO()
+        call_command('image_savings', '--pages', '1', stdout=out)
+        self.assertIn('Итого', out.getvalue())
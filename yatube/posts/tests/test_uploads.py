@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name, size, fmt='JPEG', exif=None):
+    content = BytesIO()
+    options = {'exif': exif} if exif else {}
+    Image.new('RGB', size, 'red').save(content, fmt, **options)
+    return SimpleUploadedFile(
+        name=name, content=content.getvalue(),
+        content_type=Image.MIME[fmt],
+    )
+
+
+def exif_bytes():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    return exif.tobytes()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    def create(self, image):
+        return self.authorized_client.post(
+            reverse('posts:create_post'),
+            data={'text': 'Пост', 'image': image},
+        )
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=50)
+    def test_downscaled_without_exif(self):
+        """Картинка уменьшается до предела и теряет EXIF"""
+        self.create(image_file('photo.jpg', (200, 100), exif=exif_bytes()))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (50, 25))
+            self.assertNotIn('exif', stored.info)
+
+    def test_small_image_kept_as_is(self):
+        """Картинка без EXIF в пределах размера сохраняется без изменений"""
+        upload = image_file('small.png', (30, 20), 'PNG')
+        original = upload.read()
+        upload.seek(0)
+        self.create(upload)
+        post = Post.objects.get()
+        with open(post.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), original)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_rejected(self):
+        """Слишком большое разрешение отклоняется по заголовку"""
+        response = self.create(image_file('bomb.png', (20, 20), 'PNG'))
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            response.context['form'].errors.as_data()['image'][0].code,
+            'image_bomb',
+        )
+
+    @override_settings(POSTS_UPLOAD_MAX_SIZE=1000)
+    def test_oversized_upload_rejected(self):
+        """Файл больше предела не сохраняется и отклоняется формой"""
+        noise = BytesIO()
+        Image.frombytes('RGB', (100, 100), os.urandom(30000)).save(
+            noise, 'PNG')
+        response = self.create(SimpleUploadedFile(
+            'big.png', noise.getvalue(), content_type='image/png'))
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            response.context['form'].errors.as_data()['image'][0].code,
+            'file_too_large',
+        )
+
+    def test_not_an_image_rejected(self):
+        """Не-картинка отклоняется"""
+        self.create(SimpleUploadedFile(
+            'text.jpg', b'not an image', content_type='image/jpeg'))
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,219 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import utils
+from ..models import Group, Post, User
+from ..utils import (CURSOR_NEXT, CachedCountPaginator, KeysetPaginator,
+                     decode_cursor, encode_cursor, get_paginator)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.NUM_OF_POSTS = 25
+        cls.POSTS_ON_PAGE = 10
+        for i in range(cls.NUM_OF_POSTS):
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.user,
+                group=cls.group,
+            )
+        cls.ORDERED = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        """Курсор кодируется и раскодируется без потерь"""
+        post = self.ORDERED[3]
+        cursor = encode_cursor(post, CURSOR_NEXT)
+        direction, values = decode_cursor(cursor, Post)
+        self.assertEqual(direction, CURSOR_NEXT)
+        self.assertEqual(values, [post.pub_date, post.id])
+
+    def test_broken_cursor_is_ignored(self):
+        """Испорченный курсор даёт первую страницу"""
+        self.assertIsNone(decode_cursor('not-a-cursor', Post))
+        page = KeysetPaginator(
+            Post.objects.all(), self.POSTS_ON_PAGE).get_page('garbage')
+        self.assertEqual(list(page), self.ORDERED[:self.POSTS_ON_PAGE])
+        self.assertFalse(page.has_previous())
+
+    def test_walk_older_and_newer(self):
+        """Переход по курсорам вперёд и назад совпадает с OFFSET"""
+        paginator = KeysetPaginator(Post.objects.all(), self.POSTS_ON_PAGE)
+        page_1 = paginator.get_page()
+        page_2 = paginator.get_page(page_1.next_cursor)
+        page_3 = paginator.get_page(page_2.next_cursor)
+        self.assertEqual(list(page_2), self.ORDERED[10:20])
+        self.assertEqual(list(page_3), self.ORDERED[20:])
+        self.assertFalse(page_3.has_next())
+        back = paginator.get_page(page_3.previous_cursor)
+        self.assertEqual(list(back), self.ORDERED[10:20])
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first), self.ORDERED[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_deep_page_query_count(self):
+        """Глубокая страница — один запрос без COUNT(*)"""
+        request = RequestFactory().get(
+            '/', {'cursor': encode_cursor(self.ORDERED[19], CURSOR_NEXT)})
+        with self.assertNumQueries(1):
+            context = get_paginator(Post.objects.all(), request)
+            self.assertEqual(
+                list(context['page_obj']), self.ORDERED[20:])
+
+    def test_views_accept_cursor_and_page(self):
+        """Списки принимают и ?cursor=, и старый ?page="""
+        cursor = encode_cursor(self.ORDERED[9], CURSOR_NEXT)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                by_cursor = self.guest_client.get(url, {'cursor': cursor})
+                cache.clear()
+                by_page = self.guest_client.get(url, {'page': 2})
+                cache.clear()
+                self.assertEqual(
+                    list(by_cursor.context['page_obj']),
+                    list(by_page.context['page_obj']),
+                )
+                self.assertContains(by_page, '?cursor=')
+
+    def test_same_dates_across_page_and_cursor(self):
+        """
+        При одинаковых датах постраничный режим идёт в порядке курсоров:
+        переход с ?page= на ?cursor= ничего не пропускает и не повторяет
+        """
+        Post.objects.update(pub_date=self.ORDERED[0].pub_date)
+        ordered = list(Post.objects.order_by('-pub_date', '-id'))
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url, {'page': 1})
+                page_obj = first.context['page_obj']
+                # SQLite и без id отдаёт равные даты по rowid, поэтому
+                # порядок проверяется и в самом запросе.
+                self.assertEqual(
+                    page_obj.paginator.object_list.query.order_by,
+                    ('-pub_date', '-id'),
+                )
+                cache.clear()
+                second = self.guest_client.get(
+                    url, {'cursor': page_obj.next_cursor})
+                cache.clear()
+                self.assertEqual(
+                    list(page_obj) + list(second.context['page_obj']),
+                    ordered[:2 * self.POSTS_ON_PAGE],
+                )
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.NUM_OF_POSTS = 35
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.user)
+            for i in range(cls.NUM_OF_POSTS)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """COUNT(*) выполняется один раз на подпись запроса"""
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10).count,
+                self.NUM_OF_POSTS,
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10).count,
+                self.NUM_OF_POSTS,
+            )
+
+    def test_count_invalidated_on_save_and_delete(self):
+        """Сохранение и удаление поста сбрасывают кэш счётчиков"""
+        CachedCountPaginator(Post.objects.all(), 10).count
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count,
+            self.NUM_OF_POSTS + 1,
+        )
+        post.delete()
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count,
+            self.NUM_OF_POSTS,
+        )
+
+    def test_estimated_count(self):
+        """Выше порога количество помечено как приблизительное"""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), 10, estimate_above=20)
+        self.assertGreater(paginator.count, 20)
+        self.assertTrue(paginator.count_is_estimated)
+        exact = CachedCountPaginator(
+            Post.objects.all(), 10, estimate_above=100)
+        self.assertEqual(exact.count, self.NUM_OF_POSTS)
+        self.assertFalse(exact.count_is_estimated)
+
+    def test_pages_past_estimate(self):
+        """
+        При оценке количества страницы за ней доступны: следующая
+        определяется лишней строкой выборки, а не num_pages
+        """
+        paginator = CachedCountPaginator(
+            Post.objects.filter(author=self.user), 10, estimate_above=20)
+        self.assertEqual(paginator.num_pages, 3)
+        third = paginator.get_page(3)
+        self.assertTrue(third.has_next())
+        self.assertEqual(third.next_page_number(), 4)
+        last = paginator.get_page(4)
+        self.assertEqual(len(last), 5)
+        self.assertFalse(last.has_next())
+        self.assertEqual(list(paginator.get_page_window(4)), [1, 2, 3, 4])
+        self.assertEqual(paginator.get_page(9).number, 3)
+
+    def test_estimated_pagination_in_views(self):
+        """Без точного количества нет ссылки «Последняя», курсор есть"""
+        url = reverse('posts:profile', args=(self.user.username,))
+        with mock.patch.object(utils, 'ESTIMATE_COUNT_ABOVE', 20):
+            response = Client().get(url, {'page': 3})
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.has_next())
+        self.assertIsNotNone(page_obj.next_cursor)
+        self.assertNotContains(response, 'Последняя')
+
+    def test_page_window(self):
+        """Шаблон выводит только окно страниц вокруг текущей"""
+        paginator = CachedCountPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            list(paginator.get_page_window(10, on_each_side=2)),
+            [8, 9, 10, 11, 12],
+        )
+        self.assertEqual(
+            list(paginator.get_page_window(1, on_each_side=2)), [1, 2, 3])
+        request = RequestFactory().get('/', {'page': 2})
+        page_obj = get_paginator(Post.objects.all(), request, 1)['page_obj']
+        self.assertEqual(list(page_obj.page_window), [1, 2, 3, 4, 5])
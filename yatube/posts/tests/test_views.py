@@ -5,10 +5,12 @@ from django.conf import settings
 from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -195,21 +197,49 @@ class PostPagesTests(TestCase):
         self.assertNotIn(self.post2, profile)
 
     def test_cache_index(self):
-        """Тестирование хранения и очистки кэша в index"""
+        """Тестирование хранения и сброса кэша в index"""
         post = Post.objects.create(
             text='Пост для тестирования кэша',
             author=self.user)
-        response_1 = self.authorized_client.get(
-            self.REVERSES_WAY_INDEX).content
-        post.delete()
-        response_2 = self.authorized_client.get(
+        response_1 = self.guest_client.get(
             self.REVERSES_WAY_INDEX).content
+        with self.assertNumQueries(0):
+            response_2 = self.guest_client.get(
+                self.REVERSES_WAY_INDEX).content
         self.assertEqual(response_1, response_2)
-        cache.clear()
-        response_3 = self.authorized_client.get(
+        post.delete()
+        response_3 = self.guest_client.get(
             self.REVERSES_WAY_INDEX).content
         self.assertNotEqual(response_3, response_2)
 
+    def test_cache_invalidated_on_post_edit(self):
+        """Правка поста сразу видна на страницах автора и групп"""
+        pages = (
+            self.REVERSES_WAY_INDEX,
+            self.REVERSES_WAY_GROUP_LIST,
+            self.REVERSES_WAY_PROFILE,
+            reverse('posts:group_list', args=(self.group2.slug,)),
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        self.post.text = 'Отредактированный пост'
+        self.post.group = self.group2
+        self.post.save()
+        expected = {
+            self.REVERSES_WAY_INDEX: True,
+            self.REVERSES_WAY_GROUP_LIST: False,
+            self.REVERSES_WAY_PROFILE: True,
+            reverse('posts:group_list', args=(self.group2.slug,)): True,
+        }
+        for page, contains in expected.items():
+            with self.subTest(page=page):
+                content = self.guest_client.get(page).content.decode()
+                self.assertEqual(
+                    'Отредактированный пост' in content, contains)
+        self.post.text = 'Пост'
+        self.post.group = self.group
+        self.post.save()
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -261,6 +291,54 @@ class PaginatorViewsTest(TestCase):
                 )
 
 
+class QueryCountViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group)
+        cls.URLS = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.user.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(cls.post.id,)),
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        cache.clear()
+
+    def count_queries(self):
+        counts = {}
+        for url in self.URLS:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            counts[url] = len(queries)
+        return counts
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Число запросов не растёт вместе с числом постов и комментариев"""
+        before = self.count_queries()
+        for i in range(15):
+            commentator = User.objects.create_user(username=f'user_{i}')
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}', group=self.group)
+            Comment.objects.create(
+                post=self.post, author=commentator, text=f'Коммент {i}')
+        self.assertEqual(self.count_queries(), before)
+
+
 class FollowViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -387,3 +465,174 @@ class FollowViewsTest(TestCase):
         response = self.authorized_client_2.get(self.FOLLOW_INDEX)
         new_posts = response.context.get('page_obj')
         self.assertNotIn(post, new_posts)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+        self.pages = {
+            'post_detail': reverse('posts:post_detail', args=(self.post.id,)),
+            'profile': reverse('posts:profile', args=(self.user.username,)),
+            'group_posts': reverse(
+                'posts:group_list', args=(self.group.slug,)),
+        }
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отдаётся как 304 без рендера"""
+        for name, url in self.pages.items():
+            with self.subTest(page=name):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_etag_changes(self):
+        """Новый пост, комментарий или подписка меняют ETag"""
+        changes = {
+            'post_detail': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader, author=self.user),
+            'group_posts': lambda: Post.objects.create(
+                author=self.reader, text='Новый пост', group=self.group),
+        }
+        for name, change in changes.items():
+            url = self.pages[name]
+            with self.subTest(page=name):
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_group_rename_changes_profile(self):
+        """Переименование группы видно на странице автора"""
+        url = self.pages['profile']
+        etag = self.guest_client.get(url)['ETag']
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новое название')
+        self.group.title = 'Тестовая группа'
+        self.group.save()
+
+    def test_author_rename_changes_pages(self):
+        """Новое имя автора сразу видно на всех страницах с его постами"""
+        urls = [reverse('posts:index'), *self.pages.values()]
+        for url in urls:
+            self.guest_client.get(url)
+        author = User.objects.get(id=self.user.id)
+        author.first_name, author.last_name = 'Лев', 'Толстой'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Лев Толстой')
+
+    def test_login_keeps_pages_cached(self):
+        """Сохранение пользователя без смены имени кэш не сбрасывает"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.authorized_client.force_login(self.user)
+        author = User.objects.get(id=self.user.id)
+        author.save()
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+
+    def test_etag_depends_on_user(self):
+        """Страницы разных посетителей имеют разные ETag"""
+        for name, url in self.pages.items():
+            with self.subTest(page=name):
+                self.assertNotEqual(
+                    self.guest_client.get(url)['ETag'],
+                    self.authorized_client.get(url)['ETag'],
+                )
+
+    def test_missing_post(self):
+        """Для несуществующего поста ETag не считается, ответ 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id + 100,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentsPaginationTests(TestCase):
+    COMMENTS_NUM = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(cls.COMMENTS_NUM)
+        )
+        cls.newest_first = list(
+            Comment.objects.filter(post=cls.post).order_by('-created', '-id'))
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_comments_paginated(self):
+        """Комментарии выводятся порциями от новых к старым по курсору"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.newest_first[:20])
+        shown = list(comments)
+        while comments.has_next():
+            with self.assertNumQueries(3):
+                response = self.guest_client.get(
+                    reverse('posts:comments', args=(self.post.id,)),
+                    {'cursor': comments.next_cursor},
+                )
+            self.assertNotContains(response, '<html')
+            comments = response.context['comments']
+            shown.extend(comments)
+        self.assertEqual(shown, self.newest_first)
+        self.assertNotContains(response, 'data-fragment')
+
+    def test_more_link(self):
+        """Ссылка «показать ещё» ведёт на фрагмент и работает без JS"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        cursor = response.context['comments'].next_cursor
+        self.assertContains(
+            response,
+            reverse('posts:comments', args=(self.post.id,))
+            + f'?cursor={cursor}',
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,)),
+            {'cursor': cursor},
+        )
+        self.assertEqual(
+            list(response.context['comments']), self.newest_first[20:40])
+
+    def test_missing_post(self):
+        """Фрагмент комментариев несуществующего поста — 404"""
+        response = self.guest_client.get(
+            reverse('posts:comments', args=(self.post.id + 100,)))
+        self.assertEqual(response.status_code, 404)
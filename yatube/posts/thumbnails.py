@@ -0,0 +1,114 @@
+"""
+Адаптивные варианты картинок постов, нарезанные заранее.
+
+Для каждой картинки в фоне режутся варианты нескольких ширин в WebP
+(если Pillow собран с его поддержкой) и JPEG. Сведения о готовых
+вариантах — адрес, размеры и вес файла — лежат в кэше одним ключом на
+картинку, поэтому шаблон не ходит в key-value хранилище sorl-thumbnail
+за каждым вариантом. Пока вариантов нет, шаблон показывает исходную
+картинку и ставит нарезку в очередь фоновых задач; без них картинки
+режет warm_thumbnails. Нарезав варианты, generate сбрасывает кэш
+страниц с этой картинкой, иначе они показывали бы исходник до TTL.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import features
+from sorl.thumbnail import default
+
+from .bulk import bump_pages
+from .models import Post
+from .tasks import enqueue
+
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (960, 339)
+CARD_WIDTHS = (320, 640, 960)
+# Ширина карточки в вёрстке: на узких экранах — весь экран.
+CARD_SIZES = '(max-width: 992px) 100vw, 960px'
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+VARIANTS_KEY = 'thumbnails:variants:{name}'
+VARIANTS_TIMEOUT = 60 * 60 * 24 * 30
+PENDING_KEY = 'thumbnails:pending:{name}'
+PENDING_TIMEOUT = 300
+
+
+def card_geometry(width):
+    return width, round(width * CARD_SIZE[1] / CARD_SIZE[0])
+
+
+def variants():
+    """Пары (формат, ширина) во всех сочетаниях, от узких к широким."""
+    return [(fmt, width) for fmt in FORMATS for width in CARD_WIDTHS]
+
+
+def generate(name):
+    """
+    Нарезает все варианты картинки name и запоминает их в кэше.
+    Уже нарезанные файлы sorl-thumbnail берёт из своего хранилища.
+    Если исходник не читается, флаг «в очереди» остаётся до истечения
+    PENDING_TIMEOUT, чтобы каждый показ страницы не повторял попытку.
+    """
+    ready = []
+    for fmt, width in variants():
+        geometry = '{}x{}'.format(*card_geometry(width))
+        thumbnail = default.backend.get_thumbnail(
+            name, geometry, crop='center', upscale=True, format=fmt)
+        if not thumbnail.exists():
+            logger.warning('Cannot generate thumbnails for %s', name)
+            return None
+        ready.append({
+            'format': fmt,
+            'url': thumbnail.url,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+            'bytes': default.storage.size(thumbnail.name),
+        })
+    cache.set(VARIANTS_KEY.format(name=name), ready, VARIANTS_TIMEOUT)
+    cache.delete(PENDING_KEY.format(name=name))
+    posts = list(Post.objects.filter(image=name).values_list(
+        'id', 'author_id', 'group_id'))
+    if posts:
+        post_ids, author_ids, group_ids = zip(*posts)
+        bump_pages(set(author_ids), set(group_ids) - {None}, post_ids)
+    return ready
+
+
+def schedule(name):
+    """
+    Ставит нарезку в очередь, если она ещё не поставлена. Без фоновых
+    задач (POSTS_BACKGROUND_TASKS=0) картинка только помечается
+    ожидающей: резать все варианты внутри запроса слишком дорого,
+    их нарежет warm_thumbnails.
+    """
+    if (cache.add(PENDING_KEY.format(name=name), True, PENDING_TIMEOUT)
+            and settings.POSTS_BACKGROUND_TASKS):
+        enqueue(generate, name)
+
+
+def get_variants(image):
+    """
+    Готовые варианты картинки или None. Если их нет, нарезка уходит
+    в фон, а шаблон показывает исходную картинку.
+    """
+    if not image:
+        return None
+    ready = cache.get(VARIANTS_KEY.format(name=image.name))
+    if ready is None:
+        schedule(image.name)
+    return ready
+
+
+def pick(ready, viewport_width, fmt=None):
+    """Вариант, который браузер выберет для экрана шириной viewport_width."""
+    candidates = [
+        variant for variant in ready
+        if variant['format'] == (fmt or FORMATS[0])
+    ]
+    for variant in candidates:
+        if variant['width'] >= viewport_width:
+            return variant
+    return candidates[-1]
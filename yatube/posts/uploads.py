@@ -0,0 +1,131 @@
+"""
+Приём картинок постов с ограниченным расходом памяти.
+
+Обработчик загрузки пишет файл на диск кусками и перестаёт писать, как
+только файл превысил POSTS_UPLOAD_MAX_SIZE; остаток запроса при этом
+дочитывается и отбрасывается. Проверка читает у картинки
+только заголовок: формат и размеры известны до декодирования, так что
+«бомбы» (маленький файл с огромным числом пикселей) отклоняются сразу.
+Прошедшая проверку картинка уменьшается до POSTS_IMAGE_MAX_SIDE по
+большей стороне и пересохраняется без EXIF.
+"""
+import tempfile
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+
+
+class BoundedFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Как TemporaryFileUploadHandler, но всегда на диск (даже маленькие
+    файлы) и не больше POSTS_UPLOAD_MAX_SIZE байт на файл. Лишние данные
+    читаются из запроса и отбрасываются, а у файла выставляется
+    oversized — форма сообщит об ошибке (см. PostForm) вместо того,
+    чтобы молча потерять файл. StopUpload здесь не подходит: с обрывом
+    соединения браузер не увидит форму с ошибкой, а без обрыва Django
+    всё равно дочитывает запрос.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.file.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POSTS_UPLOAD_MAX_SIZE:
+            if not self.file.oversized:
+                self.file.oversized = True
+                self.file.seek(0)
+                self.file.truncate()
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded.oversized:
+            uploaded.size = 0
+        return uploaded
+
+
+def open_header(file):
+    """
+    Открывает картинку без декодирования пикселей и проверяет формат
+    и размеры. Предупреждение Pillow о бомбе считается ошибкой.
+    """
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(file)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError(
+            'Слишком большое разрешение изображения.', code='image_bomb')
+    except Exception:
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image')
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только JPEG, PNG, GIF и WebP.',
+            code='invalid_image_format',
+        )
+    width, height = image.size
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение изображения: %(width)d×%(height)d.',
+            code='image_bomb',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def normalize(file, image):
+    """
+    Уменьшает картинку до POSTS_IMAGE_MAX_SIDE и убирает EXIF.
+    Картинку без EXIF и в пределах размера возвращает как есть.
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    в памяти не оказывается полноразмерный растр.
+    """
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    fmt = image.format
+    has_exif = bool(image.info.get('exif'))
+    if max(image.size) <= max_side and not has_exif:
+        file.seek(0)
+        return file
+    if fmt == 'JPEG':
+        image.draft('RGB', (max_side, max_side))
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    except Exception:
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image')
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # PNG берёт EXIF для записи из info, если его не передали явно.
+    image.info.pop('exif', None)
+    # Уменьшенная картинка уходит на диск, если не влезла в
+    # FILE_UPLOAD_MAX_MEMORY_SIZE.
+    normalized = UploadedFile(
+        tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE),
+        name=file.name,
+        content_type=Image.MIME[fmt],
+    )
+    image.save(normalized, fmt, **SAVE_OPTIONS.get(fmt, {}))
+    normalized.size = normalized.tell()
+    normalized.seek(0)
+    normalized.image = image
+    return normalized
@@ -1,16 +1,46 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path(
+        'rss/',
+        feeds.index_rss,
+        name='index_rss'
+    ),
+    path(
+        'atom/',
+        feeds.index_atom,
+        name='index_atom'
+    ),
     path(
         'group/<slug:slug>/',
         views.group_posts,
         name='group_list'
     ),
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.group_rss,
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.group_atom,
+        name='group_atom'
+    ),
+    path(
+        'group/<slug:slug>/export/',
+        views.export_group,
+        name='export_group'
+    ),
+    path(
+        'export/',
+        views.export_site,
+        name='export_site'
+    ),
     path(
         'posts/index.html',
         views.index,
@@ -21,11 +51,31 @@ urlpatterns = [
         views.profile,
         name='profile'
     ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.author_rss,
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.author_atom,
+        name='profile_atom'
+    ),
+    path(
+        'profile/<str:username>/export/',
+        views.export_author,
+        name='export_author'
+    ),
     path(
         'posts/<int:post_id>/',
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'search/',
+        views.search,
+        name='search'
+    ),
     path(
         'create/',
         views.post_create,
@@ -41,6 +91,11 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments_fragment,
+        name='comments'
+    ),
     path(
         'follow/',
         views.follow_index,
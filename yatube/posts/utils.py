@@ -1,10 +1,310 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
 
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-def get_paginator(value, request, paginator_page_number=10):
-    paginator = Paginator(value, paginator_page_number)
+from .cache import get_version
+
+KEYSET_FIELDS = ('pub_date', 'id')
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+COUNT_CACHE_KEY = 'posts:count:{version}:{signature}'
+COUNT_CACHE_TIMEOUT = 60 * 60
+ESTIMATE_COUNT_ABOVE = 10000
+PAGE_WINDOW_ON_EACH_SIDE = 3
+
+
+def encode_cursor(obj, direction, key_fields=KEYSET_FIELDS):
+    """Упаковывает ключ объекта в непрозрачный курсор для ссылки."""
+    opts = obj._meta
+    payload = [direction] + [
+        opts.get_field(name).value_to_string(obj) for name in key_fields
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, key_fields=KEYSET_FIELDS):
+    """Возвращает (направление, значения ключа) или None для мусора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, *values = json.loads(raw.decode())
+        if (direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+                or len(values) != len(key_fields)):
+            return None
+        values = [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(key_fields, values)
+        ]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+    if any(value is None for value in values):
+        return None
+    return direction, values
+
+
+def keyset_filter(key_fields, values, lookup):
+    """Строит условие «строго после ключа» для составного ключа."""
+    condition = Q()
+    for index, name in enumerate(key_fields):
+        branch = Q(**{f'{name}__{lookup}': values[index]})
+        for prev_name, prev_value in zip(key_fields[:index], values[:index]):
+            branch &= Q(**{prev_name: prev_value})
+        condition |= branch
+    return condition
+
+
+class KeysetPage(Sequence):
+    """Страница курсорной пагинации с интерфейсом, похожим на Page."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return self.paginator.cursor_for(
+                self.object_list[-1], CURSOR_NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return self.paginator.cursor_for(
+                self.object_list[0], CURSOR_PREVIOUS)
+        return None
+
+
+class KeysetPaginator:
+    """
+    Пагинация по составному ключу (по умолчанию pub_date, id) от новых
+    к старым. Глубокие страницы стоят столько же, сколько первая:
+    вместо OFFSET и COUNT(*) выбирается per_page + 1 строк после курсора.
+    """
+
+    def __init__(self, object_list, per_page, key_fields=KEYSET_FIELDS):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key_fields = tuple(key_fields)
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor(obj, direction, self.key_fields)
+
+    def get_page(self, cursor=None):
+        decoded = None
+        if cursor:
+            decoded = decode_cursor(
+                cursor, self.object_list.model, self.key_fields)
+        descending = [f'-{name}' for name in self.key_fields]
+        if decoded is None:
+            rows = list(
+                self.object_list.order_by(*descending)[:self.per_page + 1])
+            return KeysetPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+        direction, values = decoded
+        if direction == CURSOR_NEXT:
+            rows = list(self.object_list.filter(
+                keyset_filter(self.key_fields, values, 'lt')
+            ).order_by(*descending)[:self.per_page + 1])
+            return KeysetPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=True,
+            )
+        rows = list(self.object_list.filter(
+            keyset_filter(self.key_fields, values, 'gt')
+        ).order_by(*self.key_fields)[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page][::-1], self,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+def estimate_table_rows(model):
+    """Оценка числа строк таблицы по статистике планировщика БД."""
+    connection = connections[model.objects.db]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedPage(Page):
+    """
+    Страница при приблизительном количестве: есть ли следующая, решает
+    лишняя строка выборки, а не num_pages.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который хранит COUNT(*) в кэше по подписи SQL-запроса.
+    Ключи версионируются пространством «posts», версия сдвигается
+    сигналами сохранения и удаления Post.
+
+    При estimate_above считается не больше estimate_above + 1 строк;
+    если их больше, количество оценивается по статистике таблицы
+    (для запросов без фильтра) и помечается как приблизительное.
+    Тогда номера страниц за оценкой допустимы, а следующая страница
+    определяется по per_page + 1 строкам выборки (см. EstimatedPage).
+    """
+
+    def __init__(self, object_list, per_page, estimate_above=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.estimate_above = estimate_above
+        self.count_is_estimated = False
+
+    def count_cache_key(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except (AttributeError, EmptyResultSet):
+            return None
+        signature = hashlib.md5(
+            f'{sql}{params}{self.estimate_above}'.encode()).hexdigest()
+        return COUNT_CACHE_KEY.format(
+            version=get_version('posts'), signature=signature)
+
+    def _count_rows(self):
+        if self.estimate_above is None or not hasattr(
+                self.object_list, 'query'):
+            return Paginator.count.func(self), False
+        # Порядок строк для подсчёта не нужен, а с ORDER BY база
+        # сортировала бы выборку перед тем, как её посчитать.
+        bounded = self.object_list.order_by()[
+            :self.estimate_above + 1].count()
+        if bounded <= self.estimate_above:
+            return bounded, False
+        estimate = None
+        if not self.object_list.query.where:
+            estimate = estimate_table_rows(self.object_list.model)
+        return max(bounded, estimate or 0), True
+
+    @cached_property
+    def count(self):
+        key = self.count_cache_key()
+        cached = cache.get(key) if key else None
+        if cached is None:
+            cached = self._count_rows()
+            if key:
+                cache.set(key, cached, COUNT_CACHE_TIMEOUT)
+        count, self.count_is_estimated = cached
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_estimated or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return EstimatedPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Номер за оценкой, а строк там уже нет.
+            return self.page(self.num_pages)
+
+    def get_page_window(self, number, on_each_side=PAGE_WINDOW_ON_EACH_SIDE):
+        """Номера страниц вокруг текущей вместо полного page_range."""
+        first = max(number - on_each_side, 1)
+        last = min(number + on_each_side, max(self.num_pages, number))
+        return range(first, last + 1)
+
+
+def get_paginator(value, request, paginator_page_number=10, keyset=True):
+    """
+    Контекст пагинации. keyset=False — для списков, упорядоченных не по
+    (pub_date, id), например по релевантности: курсоры там неприменимы.
+    """
+    cursor = request.GET.get('cursor')
+    if keyset and cursor is not None:
+        paginator = KeysetPaginator(value, paginator_page_number)
+        return {
+            'paginator': paginator,
+            'page_number': None,
+            'page_obj': paginator.get_page(cursor),
+        }
+    paginator = CachedCountPaginator(
+        value, paginator_page_number, estimate_above=ESTIMATE_COUNT_ABOVE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.page_window = paginator.get_page_window(page_obj.number)
+    if keyset and page_obj.object_list:
+        if page_obj.has_next():
+            page_obj.next_cursor = encode_cursor(page_obj[-1], CURSOR_NEXT)
+        if page_obj.has_previous():
+            page_obj.previous_cursor = encode_cursor(
+                page_obj[0], CURSOR_PREVIOUS)
     return {
         'paginator': paginator,
         'page_number': page_number,
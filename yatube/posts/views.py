@@ -1,27 +1,60 @@
+from urllib.parse import urlencode
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.http import Http404
 from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.http import condition
 
-from .forms import CommentForm, PostForm
+from core.routers import use_replica
 
-from .models import Follow, Group, Post
+from .cache import cache_page_versioned, page_etag, versioned_etag
+from .export import CONTENT_TYPES, export_response
+from .forms import CommentForm, PostForm
 
-from .utils import get_paginator
+from .models import Comment, Follow, Group, Post
+from .search import search_posts
+from .utils import KEYSET_FIELDS, KeysetPaginator, get_paginator
 
 User = get_user_model()
 
-
-@cache_page(20)
+POST_CARD_FIELDS = (
+    'id', 'text', 'pub_date', 'image',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+# Порядок курсоров (pub_date, id) и в постраничном режиме: при равных
+# датах (импорт, seed) переход с ?page= на ?cursor= ничего не пропустит.
+POST_ORDER = tuple(f'-{name}' for name in KEYSET_FIELDS)
+COMMENT_FIELDS = ('id', 'text', 'created', 'post', 'author__username')
+COMMENT_KEY_FIELDS = ('created', 'id')
+COMMENTS_PER_PAGE = 20
+
+
+def post_cards(queryset):
+    """
+    Посты для карточек от новых к старым: автор и группа одним JOIN,
+    без лишних колонок.
+    """
+    return queryset.select_related('author', 'group').only(
+        *POST_CARD_FIELDS).order_by(*POST_ORDER)
+
+
+@use_replica
+@cache_page_versioned('page:index')
 def index(request):
-    post_list = Post.objects.all()
+    post_list = post_cards(Post.objects.all())
     context = get_paginator(post_list, request)
     return render(request, 'posts/index.html', context)
 
 
+@use_replica
+@condition(etag_func=versioned_etag('page:group:{slug}'))
+@cache_page_versioned('page:group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('group', 'author')
+    post_list = post_cards(group.posts.all())
     context = {
         'group': group,
     }
@@ -29,37 +62,89 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@use_replica
+@condition(etag_func=versioned_etag('page:profile:{username}', 'page:groups'))
+@cache_page_versioned('page:profile:{username}', 'page:groups')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author', 'group')
-    following_true = (
-        request.user.is_authenticated and author.following.filter(
-            user=request.user, author=author
-        ).exists() and request.user.follower.filter(
-            user=request.user,
-            author=author
-        ).exists()
-    )
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    post_list = post_cards(author.posts.all())
     context = {
         'author': author,
-        'following': following_true,
     }
     context.update(get_paginator(post_list, request))
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(request, post_id):
+    """
+    Очередная порция комментариев, от новых к старым, по курсору
+    (created, id) из ?cursor=: глубина ветки не влияет на цену запроса.
+    """
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only(*COMMENT_FIELDS)
+    return KeysetPaginator(
+        comments, COMMENTS_PER_PAGE, COMMENT_KEY_FIELDS,
+    ).get_page(request.GET.get('cursor'))
+
+
+def post_detail_namespaces(request, post_id):
+    """
+    Пост, число постов автора и названия групп — по версиям. Нужны и
+    ETag, и кэшу страницы, поэтому автор ищется один раз на запрос.
+    """
+    if not hasattr(request, '_post_detail_namespaces'):
+        author_id = Post.objects.filter(id=post_id).values_list(
+            'author_id', flat=True).first()
+        request._post_detail_namespaces = author_id and [
+            f'page:post:{post_id}', f'page:author:{author_id}',
+            'page:groups',
+        ]
+    return request._post_detail_namespaces
+
+
+def post_detail_etag(request, post_id):
+    namespaces = post_detail_namespaces(request, post_id)
+    if namespaces is None:
+        return None
+    return page_etag(request, *namespaces)
+
+
+@use_replica
+@condition(etag_func=post_detail_etag)
+@cache_page_versioned(post_detail_namespaces)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
-    comment = CommentForm()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
     context = {
         'post': post,
-        'comments': comments,
-        'form': comment,
+        'comments': comments_page(request, post_id),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(etag_func=post_detail_etag)
+def comments_fragment(request, post_id):
+    """Следующая порция комментариев HTML-фрагментом для подгрузки."""
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(request, post_id),
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list = search_posts(post_cards(Post.objects.all()), query)
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    context.update(get_paginator(post_list, request, keyset=False))
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -88,7 +173,8 @@ def post_edit(request, post_id):
             'edit_post': edit_post,
         }
         return render(request, 'posts/create_post.html', context)
-    form.save()
+    # Счётчики поста меняются в обход формы, их не перезаписываем.
+    form.save(commit=False).save(update_fields=PostForm.Meta.fields)
     return redirect('posts:post_detail', post_id)
 
 
@@ -104,10 +190,14 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@use_replica
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user)
+    # Сортировка по дате из записи ленты читается по индексу
+    # (user, -pub_date), без сортировки выборки.
+    posts = post_cards(
+        Post.objects.filter(feed_entries__user=request.user),
+    ).order_by('-feed_entries__pub_date')
     context = get_paginator(posts, request)
     return render(request, 'posts/follow.html', context)
 
@@ -126,3 +216,30 @@ def profile_unfollow(request, username):
         Follow, author__username=username, user=request.user)
     follow.delete()
     return redirect('posts:profile', username)
+
+
+def export_format(request):
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in CONTENT_TYPES:
+        raise Http404(f'Неизвестный формат выгрузки: {fmt}')
+    return fmt
+
+
+def export_author(request, username):
+    fmt = export_format(request)
+    author = get_object_or_404(User, username=username)
+    return export_response(
+        Post.objects.filter(author=author), fmt, f'posts-{author.username}')
+
+
+def export_group(request, slug):
+    fmt = export_format(request)
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        Post.objects.filter(group=group), fmt, f'posts-{group.slug}')
+
+
+@staff_member_required
+def export_site(request):
+    return export_response(
+        Post.objects.all(), export_format(request), 'posts')
@@ -31,12 +31,60 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# CACHE_BACKEND=sqlite даёт общий для всех воркеров хоста кэш без
+# внешних сервисов; locmem — отдельная копия в каждом процессе.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000')),
+            'MAX_SIZE': int(os.getenv('CACHE_MAX_SIZE', str(256 * 2 ** 20))),
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
 }
 
+# Фоновые задачи (рассылка постов по лентам, нарезка миниатюр)
+# выполняются в пуле потоков после коммита транзакции. В продакшене
+# включайте их (POSTS_BACKGROUND_TASKS=1): по умолчанию рассылка идёт
+# синхронно внутри post_create — это режим для разработки и тестов,
+# где лента должна обновляться сразу, а миниатюры не режутся вовсе
+# (см. warm_thumbnails).
+POSTS_BACKGROUND_TASKS = os.getenv('POSTS_BACKGROUND_TASKS', '0') == '1'
+
+POSTS_BACKGROUND_WORKERS = int(os.getenv('POSTS_BACKGROUND_WORKERS', '2'))
+
+# Сколько последних постов хранится в ленте подписок каждого пользователя.
+POSTS_FEED_SIZE = int(os.getenv('POSTS_FEED_SIZE', '1000'))
+
+# Загрузки всегда пишутся на диск кусками; файл больше
+# POSTS_UPLOAD_MAX_SIZE байт дочитывается из запроса вхолостую
+# и отбрасывается, ни в память, ни на диск он не попадает.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedFileUploadHandler']
+
+POSTS_UPLOAD_MAX_SIZE = int(
+    os.getenv('POSTS_UPLOAD_MAX_SIZE', str(10 * 2 ** 20)))
+
+# Картинки больше POSTS_IMAGE_MAX_PIXELS пикселей отклоняются по заголовку,
+# не декодируясь; остальные уменьшаются до POSTS_IMAGE_MAX_SIDE по большей
+# стороне и сохраняются без EXIF.
+POSTS_IMAGE_MAX_PIXELS = int(os.getenv('POSTS_IMAGE_MAX_PIXELS', '25000000'))
+
+POSTS_IMAGE_MAX_SIDE = int(os.getenv('POSTS_IMAGE_MAX_SIDE', '2048'))
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -54,11 +102,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.HoleMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -87,10 +137,40 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.getenv(
+            'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # Соединение живёт между запросами воркера, а не открывается
+        # заново на каждый; 0 — закрывать после запроса.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую
+# (их поддерживает в актуальном состоянии внешняя репликация, например
+# LiteFS). Страницы ленты читают с реплик, запись идёт в default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = dict(
+        DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает с основной базы.
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.getenv('DB_REPLICA_PIN_SECONDS', '10'))
+
+# PRAGMA для каждого нового соединения SQLite (см. core/db.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 2 ** 20))),
+    # Отрицательное значение — в КиБ: 64 МБ страничного кэша.
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-65536')),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',